@@ -0,0 +1,70 @@
+// movie_grid.js
+// Renders a user's movies from <username>.json into the page's .movie-grid.
+// Written by website_generator.py in --json mode:
+//   <script src="movie_grid.js" data-source="Nithya.json" data-page-size="100"></script>
+// Each row in the JSON file is [title, year, rating, poster_url].
+(function () {
+  var script = document.currentScript;
+  var source = script.dataset.source;
+  var pageSize = parseInt(script.dataset.pageSize, 10) || 0;
+  var placeholder = "https://via.placeholder.com/128x193.png?text=No+Image";
+
+  function el(tag, className, text) {
+    var node = document.createElement(tag);
+    if (className) node.className = className;
+    if (text !== undefined) node.textContent = text;
+    return node;
+  }
+
+  function renderMovie(row) {
+    var li = el("li");
+    var movie = el("div", "movie");
+    var img = el("img", "movie-poster");
+    img.src = row[3] || placeholder;
+    img.alt = row[0] + " poster";
+    img.loading = "lazy";
+    img.width = 128;
+    img.height = 193;
+    movie.appendChild(img);
+    movie.appendChild(el("div", "movie-title", row[0]));
+    movie.appendChild(el("div", "movie-year", row[1]));
+    movie.appendChild(el("p", null, "Rating: " + row[2]));
+    li.appendChild(movie);
+    return li;
+  }
+
+  function show(rows, grid, nav, page) {
+    var size = pageSize || rows.length || 1;
+    var pageCount = Math.max(1, Math.ceil(rows.length / size));
+    var fragment = document.createDocumentFragment();
+    rows.slice((page - 1) * size, page * size).forEach(function (row) {
+      fragment.appendChild(renderMovie(row));
+    });
+    grid.replaceChildren(fragment);
+
+    nav.replaceChildren();
+    if (pageCount === 1) return;
+    if (page > 1) {
+      var prev = el("a", null, "« Previous");
+      prev.href = "#";
+      prev.onclick = function () { show(rows, grid, nav, page - 1); return false; };
+      nav.appendChild(prev);
+    }
+    nav.appendChild(el("span", null, " Page " + page + " of " + pageCount + " "));
+    if (page < pageCount) {
+      var next = el("a", null, "Next »");
+      next.href = "#";
+      next.onclick = function () { show(rows, grid, nav, page + 1); return false; };
+      nav.appendChild(next);
+    }
+  }
+
+  fetch(source)
+    .then(function (response) { return response.json(); })
+    .then(function (rows) {
+      var grid = document.querySelector(".movie-grid");
+      var nav = el("div", "page-nav");
+      grid.parentNode.appendChild(nav);
+      show(rows, grid, nav, 1);
+    });
+})();
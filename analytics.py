@@ -0,0 +1,190 @@
+# ---------------------------------------------------------
+# analytics.py
+# Library-wide statistics across every user profile
+#
+# Usage:
+#   python3 analytics.py --out report.json
+#   python3 analytics.py --out report.json --csv report/ --top 50
+# ---------------------------------------------------------
+#
+# One pass over the movies view, read in chunks of --chunk-size rows. Each
+# chunk is turned into columns and folded into fixed-size accumulators:
+# ratings into 0.1-wide bins (percentiles and histograms come from these),
+# years into decades, and owner counts per catalog entry and per user. Memory
+# is bounded by the chunk size plus the number of catalog entries and users,
+# never by the number of rows. With NumPy installed each chunk is aggregated
+# with bincount / unique; without it, with C-level Counter updates.
+
+from __future__ import annotations
+import argparse
+import csv
+import heapq
+import json
+import os
+import sys
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import repeat
+from operator import floordiv, mul
+
+import storage.movie_storage_sql as storage
+
+try:
+    import numpy
+except ImportError:   # the pure-Python path gives the same report
+    numpy = None
+
+RATING_BINS = 101                      # 0.0, 0.1, ... 10.0
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95, 99)
+
+
+class LibraryStats:
+    """Running totals for the report; feed it chunks with add_chunk()."""
+
+    __slots__ = ("rows", "rating_sum", "rating_bins", "decades", "owners", "user_sizes")
+
+    def __init__(self):
+        self.rows = 0
+        self.rating_sum = 0.0
+        self.rating_bins = array("q", bytes(8 * RATING_BINS))
+        self.decades = Counter()       # 1990 -> movies from the 1990s
+        self.owners = Counter()        # catalog_id -> users owning it
+        self.user_sizes = Counter()    # user_id -> collection size
+
+    def add_chunk(self, rows) -> None:
+        """Fold a list of (user_id, catalog_id, year, rating) tuples in."""
+        if not rows:
+            return
+        user_ids, catalog_ids, years, ratings = zip(*rows)
+        self.rows += len(rows)
+        if numpy is not None:
+            self._add_numpy(user_ids, catalog_ids, years, ratings)
+        else:
+            self._add_python(user_ids, catalog_ids, years, ratings)
+
+    def _add_numpy(self, user_ids, catalog_ids, years, ratings):
+        ratings = numpy.array(ratings, dtype=numpy.float64)
+        self.rating_sum += float(ratings.sum())
+        bins = numpy.clip(numpy.rint(ratings * 10), 0, RATING_BINS - 1).astype(numpy.int64)
+        for index, n in enumerate(numpy.bincount(bins, minlength=RATING_BINS).tolist()):
+            self.rating_bins[index] += n
+        for counter, values in ((self.decades, numpy.array(years, dtype=numpy.int64) // 10 * 10),
+                                (self.owners, numpy.array(catalog_ids, dtype=numpy.int64)),
+                                (self.user_sizes, numpy.array(user_ids, dtype=numpy.int64))):
+            keys, counts = numpy.unique(values, return_counts=True)
+            counter.update(dict(zip(keys.tolist(), counts.tolist())))
+
+    def _add_python(self, user_ids, catalog_ids, years, ratings):
+        self.rating_sum += sum(ratings)
+        bins = Counter(map(round, map(mul, ratings, repeat(10))))
+        for index, n in bins.items():
+            self.rating_bins[min(max(index, 0), RATING_BINS - 1)] += n
+        self.decades.update(map(mul, map(floordiv, years, repeat(10)), repeat(10)))
+        self.owners.update(catalog_ids)
+        self.user_sizes.update(user_ids)
+
+    # ---------- RESULTS ----------
+
+    def percentile(self, percent: float) -> float | None:
+        """Nearest-rank percentile of all ratings, to the 0.1 bin."""
+        if self.rows == 0:
+            return None
+        rank = max(1, -(-percent * self.rows // 100))    # ceil without floats drifting
+        seen = 0
+        for index, n in enumerate(self.rating_bins):
+            seen += n
+            if seen >= rank:
+                return index / 10
+        return (RATING_BINS - 1) / 10
+
+    def rating_histogram(self) -> dict:
+        """Movies per whole-number rating bucket; 10.0 counts in 9-10."""
+        buckets = [0] * 10
+        for index, n in enumerate(self.rating_bins):
+            buckets[min(index // 10, 9)] += n
+        return {f"{low}-{low + 1}": n for low, n in enumerate(buckets)}
+
+    def report(self, users: list, top: int = 25) -> dict:
+        """The full report as plain data. `users` is storage.get_all_users()."""
+        most_owned = heapq.nlargest(top, self.owners.items(), key=lambda item: (item[1], -item[0]))
+        entries = storage.get_catalog_entries(catalog_id for catalog_id, _ in most_owned)
+        sizes = sorted(self.user_sizes.get(user["id"], 0) for user in users)
+        return {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "movies": self.rows,
+            "catalog_entries_owned": len(self.owners),
+            "average_rating": self.rating_sum / self.rows if self.rows else None,
+            "rating_percentiles": {f"p{p}": self.percentile(p) for p in PERCENTILES},
+            "rating_histogram": self.rating_histogram(),
+            "decades": {f"{decade}s": n for decade, n in sorted(self.decades.items())},
+            "most_owned": [
+                {"title": entries[catalog_id]["title"], "year": entries[catalog_id]["year"],
+                 "owners": owners}
+                for catalog_id, owners in most_owned
+            ],
+            "users": {
+                "count": len(sizes),
+                "min_size": sizes[0] if sizes else None,
+                "median_size": sizes[len(sizes) // 2] if sizes else None,
+                "max_size": sizes[-1] if sizes else None,
+                "sizes": {user["name"]: self.user_sizes.get(user["id"], 0) for user in users},
+            },
+        }
+
+
+def collect(chunk_size: int = 50_000) -> LibraryStats:
+    """Run the single pass over every user's movies."""
+    stats = LibraryStats()
+    for rows in storage.iter_library_chunks(chunk_size):
+        stats.add_chunk(rows)
+    return stats
+
+
+def write_csv(report: dict, folder: str) -> None:
+    """One CSV per table of the report."""
+    os.makedirs(folder, exist_ok=True)
+    tables = {
+        "rating_percentiles.csv": (("percentile", "rating"), report["rating_percentiles"].items()),
+        "rating_histogram.csv": (("rating", "movies"), report["rating_histogram"].items()),
+        "decades.csv": (("decade", "movies"), report["decades"].items()),
+        "most_owned.csv": (("title", "year", "owners"),
+                           ((m["title"], m["year"], m["owners"]) for m in report["most_owned"])),
+        "user_sizes.csv": (("user", "movies"), report["users"]["sizes"].items()),
+    }
+    for name, (header, rows) in tables.items():
+        with open(os.path.join(folder, name), "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Library-wide analytics across all users.")
+    parser.add_argument("--out", default="data/analytics.json", help="JSON report path")
+    parser.add_argument("--csv", help="also write CSV tables into this folder")
+    parser.add_argument("--top", type=int, default=25, help="most-owned titles to list")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="rows read per chunk")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stats = collect(args.chunk_size)
+    report = stats.report(storage.get_all_users(), args.top)
+
+    folder = os.path.dirname(args.out)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    if args.csv:
+        write_csv(report, args.csv)
+
+    print(f"Analysed {report['movies']} movies of {report['users']['count']} users "
+          f"in {time.perf_counter() - started:.1f}s.")
+    print(f"Report written to {args.out}" + (f" and {args.csv}" if args.csv else "") + ".")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
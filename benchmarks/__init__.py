@@ -0,0 +1,3 @@
+# benchmarks/
+# Timing scripts for the Movie Project, run from the repo root, e.g.
+#   python3 -m benchmarks.startup
@@ -0,0 +1,88 @@
+# ---------------------------------------------------------
+# benchmarks/columns.py
+# Memory and speed of storage.load_movie_columns versus the
+# dict-per-movie collection returned by list_movies
+#
+# Usage: python3 -m benchmarks.columns [--movies 50000] [--repeat 5]
+# ---------------------------------------------------------
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import storage.movie_storage_sql as storage
+
+
+def allocated_bytes(load):
+    """Bytes still allocated after load() returns, and its result."""
+    tracemalloc.start()
+    result = load()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def dict_statistics(movies: dict):
+    """Stats over a list_movies() dict the way the menu used to compute them."""
+    ratings = [float(info.get("rating", 0.0)) for info in movies.values()]
+    highest, lowest = max(ratings), min(ratings)
+    return {
+        "average": sum(ratings) / len(ratings),
+        "median": statistics.median(ratings),
+        "best_titles": [t for t, info in movies.items() if float(info["rating"]) == highest],
+        "worst_titles": [t for t, info in movies.items() if float(info["rating"]) == lowest],
+    }
+
+
+def best_ms(function, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return min(samples)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare collection representations.")
+    parser.add_argument("--movies", type=int, default=50_000, help="size of the one collection")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        storage.configure(db_url=f"sqlite:///{folder}/movies.db")
+        user_id = storage.add_user("bench")["id"]
+        storage.add_movies(user_id, (
+            (f"Movie {i}", 1900 + i % 125, (i * 7 % 100) / 10,
+             f"http://posters.invalid/{i}.jpg")
+            for i in range(args.movies)
+        ), batch_size=5_000)
+
+        dict_size, movies = allocated_bytes(lambda: storage._load_collection(user_id))
+        column_size, columns = allocated_bytes(lambda: storage.load_movie_columns(user_id))
+        print(f"{'':24} {'dicts':>12} {'columns':>12}")
+        print(f"{'bytes per movie':24} {dict_size / len(movies):12.0f} "
+              f"{column_size / len(columns):12.0f}")
+
+        timings = {
+            "statistics": (lambda: dict_statistics(movies), columns.statistics),
+            "sort by rating": (
+                lambda: sorted(movies.items(), key=lambda item: item[1]["rating"], reverse=True),
+                lambda: columns.order_by("rating", descending=True)),
+            "filter": (
+                lambda: {t: m for t, m in movies.items()
+                         if m["rating"] >= 7 and 1990 <= m["year"] <= 2010},
+                lambda: columns.where(min_rating=7, start_year=1990, end_year=2010)),
+        }
+        for label, (with_dicts, with_columns) in timings.items():
+            print(f"{label + ' (ms)':24} {best_ms(with_dicts, args.repeat):12.2f} "
+                  f"{best_ms(with_columns, args.repeat):12.2f}")
+        storage.configure()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# ---------------------------------------------------------
+# benchmarks/contention.py
+# Sustained write throughput with many writers at once:
+# the group-commit writer queue versus one commit per call
+#
+# Usage:
+#   python3 -m benchmarks.contention [--processes 4] [--threads 8]
+#                                    [--readers 1] [--seconds 5]
+#                                    [--modes queue,direct]
+#
+# Every process runs --threads writer threads, each alternating
+# add_movie and update_movie on its own user, plus --readers
+# threads calling list_movies. Failed writes are calls that gave
+# up, e.g. on "database is locked".
+# ---------------------------------------------------------
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+
+import storage.movie_storage_sql as storage
+
+
+def writer_loop(user_id, deadline, totals, lock):
+    writes = failures = 0
+    latencies = []
+    n = 0
+    while time.perf_counter() < deadline:
+        title = f"Movie {user_id}-{n}"
+        started = time.perf_counter()
+        try:
+            ok = storage.add_movie(user_id, title, 1900 + n % 125, (n * 7 % 100) / 10)
+            ok = storage.update_movie(user_id, title, (n * 3 % 100) / 10) and ok
+        except SQLAlchemyError:
+            ok = False
+        latencies.append((time.perf_counter() - started) / 2)
+        writes += 2 if ok else 0
+        failures += 0 if ok else 1
+        n += 1
+    with lock:
+        totals["writes"] += writes
+        totals["failures"] += failures
+        totals["latencies"].extend(latencies)
+
+
+def reader_loop(user_id, deadline, totals, lock):
+    reads = 0
+    while time.perf_counter() < deadline:
+        storage.list_movies(user_id)
+        reads += 1
+    with lock:
+        totals["reads"] += reads
+
+
+def run_process(db_url, use_queue, user_ids, readers, seconds, results):
+    """One worker process: writer threads on user_ids plus reader threads."""
+    storage.configure(db_url=db_url)
+    storage.WRITE_QUEUE_ENABLED = use_queue
+    totals = {"writes": 0, "failures": 0, "reads": 0, "latencies": []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=writer_loop, args=(user_id, deadline, totals, lock))
+               for user_id in user_ids]
+    threads += [threading.Thread(target=reader_loop, args=(user_id, deadline, totals, lock))
+                for user_id in user_ids[:readers]]
+    with contextlib.redirect_stdout(io.StringIO()):   # add_movie etc. print
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    storage.configure()
+    results.put(totals)
+
+
+def run_mode(mode, args):
+    with tempfile.TemporaryDirectory() as folder:
+        db_url = f"sqlite:///{folder}/movies.db"
+        storage.configure(db_url=db_url)
+        with contextlib.redirect_stdout(io.StringIO()):
+            user_ids = [storage.add_user(f"writer {i}")["id"]
+                        for i in range(args.processes * args.threads)]
+        storage.configure()
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=run_process, args=(
+                db_url, mode == "queue",
+                user_ids[p * args.threads:(p + 1) * args.threads], args.readers,
+                args.seconds, results))
+            for p in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    latencies = sorted(l for t in totals for l in t["latencies"])
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    return {
+        "writes/s": sum(t["writes"] for t in totals) / args.seconds,
+        "failed": sum(t["failures"] for t in totals),
+        "reads/s": sum(t["reads"] for t in totals) / args.seconds,
+        "p95 ms": p95,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Write throughput under contention.")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="writer threads per process")
+    parser.add_argument("--readers", type=int, default=1, help="reader threads per process")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--modes", default="queue,direct", help="comma-separated: queue, direct")
+    args = parser.parse_args(argv)
+
+    print(f"{args.processes} processes x {args.threads} writer threads, {args.seconds:g}s each")
+    print(f"{'mode':8} {'writes/s':>10} {'failed':>8} {'reads/s':>10} {'p95 ms':>9}")
+    for mode in args.modes.split(","):
+        result = run_mode(mode, args)
+        print(f"{mode:8} {result['writes/s']:10.0f} {result['failed']:8} "
+              f"{result['reads/s']:10.0f} {result['p95 ms']:9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
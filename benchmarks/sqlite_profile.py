@@ -0,0 +1,69 @@
+# ---------------------------------------------------------
+# benchmarks/sqlite_profile.py
+# Write / read throughput with and without the SQLite
+# performance profile (WAL, tuned pragmas, pooled connections)
+#
+# Usage: python3 -m benchmarks.sqlite_profile [--writes 500] [--reads 500]
+# ---------------------------------------------------------
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy.pool import NullPool
+
+import storage.movie_storage_sql as storage
+
+SETUPS = {
+    # Baseline: default journal, synchronous=FULL, a new connection per call
+    "baseline": {"profile": False, "poolclass": NullPool},
+    # Profile: pragmas from SQLITE_PRAGMAS, connections reused by QueuePool
+    "profile": {"profile": True},
+}
+
+
+def run(setup: dict, folder: str, writes: int, reads: int) -> dict:
+    """Times `writes` single-row add_movie commits and `reads` list_movies calls."""
+    storage.configure(db_url=f"sqlite:///{folder}/movies.db", **setup)
+    user_id = storage.add_user("bench")["id"]
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):   # add_movie prints per row
+        for i in range(writes):
+            storage.add_movie(user_id, f"Movie {i}", 1900 + i % 120, (i % 100) / 10)
+    write_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(reads):
+        storage.list_movies(user_id)
+    read_seconds = time.perf_counter() - started
+
+    storage.configure()   # dispose the engine before the folder goes away
+    return {"writes_per_s": writes / write_seconds, "reads_per_s": reads / read_seconds}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare SQLite settings.")
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--reads", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, setup in SETUPS.items():
+        with tempfile.TemporaryDirectory() as folder:
+            results[name] = run(setup, folder, args.writes, args.reads)
+        print(f"{name:9} {results[name]['writes_per_s']:9.0f} writes/s "
+              f"{results[name]['reads_per_s']:9.0f} reads/s")
+
+    base, tuned = results["baseline"], results["profile"]
+    print(f"speed-up: writes x{tuned['writes_per_s'] / base['writes_per_s']:.1f}, "
+          f"reads x{tuned['reads_per_s'] / base['reads_per_s']:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
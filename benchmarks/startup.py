@@ -0,0 +1,76 @@
+# ---------------------------------------------------------
+# benchmarks/startup.py
+# Cold-start budget for `python movies.py`
+#
+# Measures, in fresh interpreter processes:
+#   import   - importing movies.py (must not touch the database)
+#   first_db - import + first storage call (engine + schema check)
+# and fails if the median is over budget.
+#
+# Usage: python3 -m benchmarks.startup [--runs 7] [--json results.json]
+# ---------------------------------------------------------
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Budgets in milliseconds (median of the runs), including interpreter start-up
+BUDGET_MS = {
+    "import": 400,
+    "first_db": 600,
+}
+
+SNIPPETS = {
+    "import": "import movies",
+    "first_db": "import movies; movies.storage.count_movies(1)",
+}
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_snippet(snippet: str, env: dict) -> float:
+    """Runs a snippet in a fresh interpreter and returns wall time in ms."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", snippet], cwd=REPO_ROOT, env=env, check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold-start time of movies.py.")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, MOVIES_DB_URL=f"sqlite:///{tmp}/movies.db")
+        # First run creates the schema; it is not part of the budget
+        time_snippet(SNIPPETS["first_db"], env)
+        for name, snippet in SNIPPETS.items():
+            samples = [time_snippet(snippet, env) for _ in range(args.runs)]
+            results[name] = {
+                "median_ms": statistics.median(samples),
+                "min_ms": min(samples),
+                "budget_ms": BUDGET_MS[name],
+            }
+
+    over_budget = False
+    for name, result in results.items():
+        status = "ok" if result["median_ms"] <= result["budget_ms"] else "OVER BUDGET"
+        over_budget = over_budget or status != "ok"
+        print(f"{name:10} median {result['median_ms']:7.1f} ms  "
+              f"(min {result['min_ms']:.1f}, budget {result['budget_ms']})  {status}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
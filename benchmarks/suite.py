@@ -0,0 +1,228 @@
+# ---------------------------------------------------------
+# benchmarks/suite.py
+# Times the storage layer, the movies.py menu actions and
+# website generation at several synthetic data sizes
+#
+# Usage:
+#   python3 -m benchmarks.suite --sizes tiny,small --out results.json
+#   python3 -m benchmarks.suite --sizes small --compare results.json
+#
+# Each size gets a fresh temp database (see benchmarks/synthetic.py).
+# OMDb is replaced by a local stub server, so nothing leaves the machine.
+# ---------------------------------------------------------
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import text
+
+import movie_api
+import movies
+import storage.movie_storage_sql as storage
+import website_generator
+from benchmarks import synthetic
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StubOmdbHandler(BaseHTTPRequestHandler):
+    """Answers every lookup with the same movie, like a very fast OMDb."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body = json.dumps({"Response": "True", "Year": "1999", "imdbRating": "8.1",
+                       "Poster": "http://posters.invalid/stub.jpg"}).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def measure(function, repeat: int) -> dict:
+    """Run `function` repeat times with stdout silenced; return timings in ms."""
+    samples = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            function()
+            samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+        "repeat": repeat,
+    }
+
+
+def answers(*values):
+    """Replacement for input() in movies.py that replays `values` forever."""
+    state = {"index": 0}
+
+    def fake_input(prompt=""):
+        value = values[state["index"] % len(values)]
+        state["index"] += 1
+        return value
+    return fake_input
+
+
+def run_size(name: str, folder: str, repeat: int) -> dict:
+    """Generate one data size and time every benchmark against it."""
+    users, total = synthetic.SIZES[name]
+    storage.configure(db_url=f"sqlite:///{folder}/movies.db")
+
+    started = time.perf_counter()
+    synthetic.generate(users, total)
+    generate_seconds = time.perf_counter() - started
+
+    # Benchmark against the biggest collection: that's where scaling shows
+    with storage.get_engine().connect() as connection:
+        user_id, movie_count = connection.execute(text("""
+            SELECT user_id, COUNT(*) FROM movies GROUP BY user_id
+            ORDER BY COUNT(*) DESC LIMIT 1
+        """)).fetchone()
+    movies.current_user_id = user_id
+    movies.current_username = f"bench_{name}"
+    website_generator.OUTPUT_FOLDER = folder
+
+    counter = {"n": 0}
+
+    def add_then_delete():
+        counter["n"] += 1
+        title = f"Benchmark Movie {counter['n']}"
+        storage.add_movie(user_id, title, 2000, 7.5)
+        storage.delete_movie(user_id, title)
+
+    def update():
+        counter["n"] += 1
+        storage.update_movie(user_id, synthetic.catalog_title(0), (counter["n"] % 100) / 10)
+
+    def menu_add_movie():
+        counter["n"] += 1
+        movies.input = answers(f"Stub Movie {counter['n']}")
+        movies.add_movie()
+
+    def list_movies_uncached():
+        storage.clear_collection_cache()
+        storage.list_movies(user_id)
+
+    def list_movies_cached():
+        # The collection cache is opt-in; only this benchmark turns it on
+        storage.COLLECTION_CACHE_ENABLED = True
+        try:
+            storage.list_movies(user_id)
+        finally:
+            storage.COLLECTION_CACHE_ENABLED = False
+
+    benchmarks = {
+        "storage.list_movies": list_movies_uncached,
+        "storage.list_movies (cached)": list_movies_cached,
+        "storage.add_movie + delete_movie": add_then_delete,
+        "storage.update_movie": update,
+        "movies.print_statistics": movies.print_statistics,
+        "movies.sort_movies_by_rating": movies.sort_movies_by_rating,
+        "movies.sort_movies_chronological": lambda: (
+            setattr(movies, "input", answers("y")), movies.sort_movies_chronological()),
+        "movies.filter_movies": lambda: (
+            setattr(movies, "input", answers("7.5", "1990", "2010")), movies.filter_movies()),
+        "movies.add_movie (OMDb stub)": menu_add_movie,
+        "website_generator.generate_website": lambda: website_generator.build_site(
+            user_id, movies.current_username, force=True),
+    }
+
+    results = {
+        "users": users,
+        "movies": total,
+        "benchmark_user_movies": movie_count,
+        "generate_seconds": generate_seconds,
+        "timings": {},
+    }
+    for label, function in benchmarks.items():
+        results["timings"][label] = measure(function, repeat)
+        print(f"  {label:40} {results['timings'][label]['median_ms']:10.2f} ms")
+
+    storage.configure()   # release the temp database
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline: dict) -> None:
+    """Print median ratios current / baseline for every shared benchmark."""
+    print(f"\nCompared with {baseline['revision']} ({baseline['timestamp']}):")
+    for size, result in current["sizes"].items():
+        old = baseline["sizes"].get(size)
+        if old is None:
+            continue
+        print(f"  [{size}]")
+        for label, timing in result["timings"].items():
+            if label in old["timings"]:
+                ratio = timing["median_ms"] / max(old["timings"][label]["median_ms"], 1e-9)
+                flag = "  slower" if ratio > 1.2 else ""
+                print(f"    {label:40} x{ratio:6.2f}{flag}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the Movie Project benchmark suite.")
+    parser.add_argument("--sizes", default="tiny,small",
+                        help=f"comma-separated, from: {', '.join(synthetic.SIZES)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOmdbHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    movie_api.set_client(movie_api.OmdbClient(
+        base_url=f"http://127.0.0.1:{server.server_address[1]}/"))
+    movie_api.CACHE_ENABLED = False
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": {},
+    }
+    try:
+        for size in args.sizes.split(","):
+            print(f"[{size}] {synthetic.SIZES[size][0]} users, {synthetic.SIZES[size][1]} movies")
+            with tempfile.TemporaryDirectory() as folder:
+                report["sizes"][size] = run_size(size, folder, args.repeat)
+    finally:
+        server.shutdown()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
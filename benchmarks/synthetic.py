@@ -0,0 +1,94 @@
+# ---------------------------------------------------------
+# benchmarks/synthetic.py
+# Seeded synthetic data for the benchmarks: users with
+# collections drawn from a shared catalog of titles
+# ---------------------------------------------------------
+
+import random
+
+from sqlalchemy import text
+
+import storage.movie_storage_sql as storage
+
+# name -> (users, movies in total)
+SIZES = {
+    "tiny": (10, 1_000),
+    "small": (100, 10_000),
+    "medium": (1_000, 100_000),
+    "large": (10_000, 1_000_000),
+}
+
+WORDS = ["Dark", "Night", "Return", "Star", "Love", "City", "Last", "Lost", "Blue",
+         "King", "Red", "Secret", "War", "Dream", "Ghost", "River", "Storm", "Iron"]
+
+
+def catalog_title(number: int) -> str:
+    """Deterministic, readable title for catalog entry `number`."""
+    first = WORDS[number % len(WORDS)]
+    second = WORDS[(number // len(WORDS)) % len(WORDS)]
+    return f"The {first} {second} {number}"
+
+
+def catalog_movie(number: int) -> tuple:
+    """(title, year, rating, poster_url) for catalog entry `number`."""
+    rng = random.Random(number)
+    return (
+        catalog_title(number),
+        rng.randint(1920, 2025),
+        round(rng.uniform(1.0, 10.0), 1),
+        f"http://posters.invalid/{number}.jpg" if rng.random() < 0.9 else None,
+    )
+
+
+def generate(users: int, movies: int, seed: int = 42, batch_size: int = 5_000) -> list:
+    """
+    Fill the configured database with `users` profiles and about `movies`
+    movies. Collection sizes vary per user (popular users own more), and
+    titles come from a catalog of movies // 4 entries, so many users share
+    titles like real libraries do. Returns the created user ids.
+    """
+    rng = random.Random(seed)
+    catalog_size = max(10, movies // 4)
+    weights = [rng.paretovariate(2.0) for _ in range(users)]
+    scale = movies / sum(weights)
+    user_ids = []
+
+    with storage.get_engine().connect() as connection:
+        connection.execute(
+            text("INSERT INTO users (name) VALUES (:name)"),
+            [{"name": f"bench_user_{i:06d}"} for i in range(users)],
+        )
+        connection.commit()
+        user_ids = [row[0] for row in connection.execute(text(
+            "SELECT id FROM users WHERE name LIKE 'bench_user_%' ORDER BY name"
+        ))]
+
+    # The whole catalog first (ids follow catalog numbers), then the links
+    with storage.get_engine().connect() as connection:
+        first_id = (connection.execute(text("SELECT MAX(id) FROM catalog")).scalar() or 0) + 1
+        for start in range(0, catalog_size, batch_size):
+            connection.execute(text("""
+                INSERT INTO catalog (id, title, year, rating, poster_url)
+                VALUES (:id, :title, :year, :rating, :poster_url)
+            """), [
+                dict(zip(("title", "year", "rating", "poster_url"), catalog_movie(number)),
+                     id=first_id + number)
+                for number in range(start, min(start + batch_size, catalog_size))
+            ])
+
+        statement = text("""
+            INSERT INTO user_movies (user_id, catalog_id, title, year, effective_rating)
+            SELECT :user_id, id, title, year, rating FROM catalog WHERE id = :catalog_id
+        """)
+        batch = []
+        for user_id, weight in zip(user_ids, weights):
+            count = min(catalog_size, max(1, round(weight * scale)))
+            for number in rng.sample(range(catalog_size), count):
+                batch.append({"user_id": user_id, "catalog_id": first_id + number})
+                if len(batch) >= batch_size:
+                    connection.execute(statement, batch)
+                    batch = []
+        if batch:
+            connection.execute(statement, batch)
+        connection.commit()
+    return user_ids
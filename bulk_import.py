@@ -0,0 +1,163 @@
+# ---------------------------------------------------------
+# bulk_import.py
+# Imports a whole list of movie titles for one user profile
+#
+# Usage:
+#   python3 bulk_import.py --user Nithya titles.txt
+#   cat titles.txt | python3 bulk_import.py --user Nithya
+# ---------------------------------------------------------
+
+from __future__ import annotations
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import movie_api
+import storage.movie_storage_sql as storage
+
+
+class RateLimiter:
+    """Lets at most `rate` calls per second through, shared by all worker threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Blocks until the caller's turn comes up."""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def read_titles(lines) -> list[str]:
+    """Returns the non-empty titles from an iterable of lines, first occurrence wins."""
+    titles = []
+    seen = set()
+    for line in lines:
+        title = line.strip()
+        key = movie_api.normalize_title(title)
+        if title and key not in seen:
+            seen.add(key)
+            titles.append(title)
+    return titles
+
+
+def _cached(title: str) -> bool:
+    """True when lookup_movie will answer `title` from the OMDb cache."""
+    return (movie_api.CACHE_ENABLED
+            and movie_api.cache_get(movie_api.normalize_title(title)) is not None)
+
+
+def resolve_titles(titles: list[str], workers: int = 8, rate: float = 10.0):
+    """
+    Looks up every title on OMDb in a bounded thread pool.
+    Yields (title, movie) in input order; movie is (year, rating, poster_url)
+    or None when the title could not be resolved (unknown, network error, or
+    an answer that could not be read).
+    """
+    limiter = RateLimiter(rate)
+
+    def resolve(title):
+        # Only requests that actually go to OMDb count against the rate
+        if not _cached(title):
+            limiter.wait()
+        try:
+            movie = movie_api.lookup_movie(title)
+        except (requests.exceptions.RequestException, ValueError):
+            return None
+        # Same rule as movies.add_movie: the table needs a year and a rating
+        if movie is None or movie[0] is None or movie[1] is None:
+            return None
+        return movie
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from zip(titles, pool.map(resolve, titles))
+
+
+def get_or_create_user(name: str) -> dict:
+    """Returns the user dict for `name`, creating the profile if needed."""
+    for user in storage.get_all_users():
+        if user["name"] == name:
+            return user
+    return storage.add_user(name)
+
+
+def _insert_batch(user_id: int, rows: list) -> int:
+    """Writes one batch of resolved rows; returns how many were new."""
+    outcomes = storage.add_movies(user_id, rows, batch_size=len(rows))
+    return sum(1 for _, outcome in outcomes if outcome == storage.INSERTED)
+
+
+def bulk_import(user_id: int, titles: list[str], workers: int = 8,
+                rate: float = 10.0, batch_size: int = 500):
+    """
+    Resolves titles concurrently and writes them in batches.
+    Returns (inserted_count, unresolved_titles).
+    """
+    unresolved = []
+
+    def resolved_rows():
+        for title, movie in resolve_titles(titles, workers, rate):
+            if movie is None:
+                unresolved.append(title)
+            else:
+                yield (title, *movie)
+
+    # One transaction per batch: the write lock isn't held while OMDb answers
+    inserted = 0
+    batch = []
+    for row in resolved_rows():
+        batch.append(row)
+        if len(batch) >= batch_size:
+            inserted += _insert_batch(user_id, batch)
+            batch = []
+    if batch:
+        inserted += _insert_batch(user_id, batch)
+    return inserted, unresolved
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import movie titles for a user.")
+    parser.add_argument("file", nargs="?", help="file with one title per line (default: stdin)")
+    parser.add_argument("--user", required=True, help="profile name (created if missing)")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent OMDb lookups")
+    parser.add_argument("--rate", type=float, default=10.0, help="max OMDb requests per second")
+    parser.add_argument("--batch-size", type=int, default=500, help="rows per transaction")
+    args = parser.parse_args(argv)
+
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            titles = read_titles(f)
+    else:
+        titles = read_titles(sys.stdin)
+
+    user = get_or_create_user(args.user)
+    if user is None:
+        print(f"Could not create user '{args.user}'.")
+        return 1
+
+    started = time.perf_counter()
+    inserted, unresolved = bulk_import(user["id"], titles, args.workers,
+                                       args.rate, args.batch_size)
+    elapsed = time.perf_counter() - started
+
+    print(f"Imported {inserted} of {len(titles)} title(s) for {user['name']} "
+          f"in {elapsed:.1f}s.")
+    if unresolved:
+        print(f"{len(unresolved)} title(s) could not be resolved:")
+        for title in unresolved:
+            print(f"  {title}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+# ---------------------------------------------------------
+# metrics.py
+# Lightweight in-process instrumentation for the Movie Project
+# ---------------------------------------------------------
+#
+# Operations (storage calls, OMDb requests, site builds) record their
+# latency into fixed-bucket histograms; counters track everything else.
+# Storage operations also count the SQL statements they run and the rows
+# they return. Everything is off unless ENABLED is set (MOVIES_METRICS=1
+# or the Diagnostics menu); when off, instrumented calls cost one flag check.
+
+from __future__ import annotations
+import functools
+import json
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("MOVIES_METRICS", "") not in ("", "0")
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open-ended)
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """Latency histogram with fixed buckets plus count / sum / min / max."""
+
+    __slots__ = ("buckets", "count", "total_ms", "min_ms", "max_ms")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def observe(self, value_ms: float) -> None:
+        index = 0
+        while index < len(BUCKETS_MS) and value_ms > BUCKETS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.min_ms = value_ms if self.min_ms is None else min(self.min_ms, value_ms)
+        self.max_ms = value_ms if self.max_ms is None else max(self.max_ms, value_ms)
+
+    def percentile(self, fraction: float) -> float | None:
+        """Upper bound of the bucket holding the given fraction (approximate)."""
+        if self.count == 0:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": self.total_ms / self.count if self.count else None,
+            "min_ms": self.min_ms,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": self.max_ms,
+            "buckets": {
+                (f"<={bound}" if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}"): n
+                for i, (bound, n) in enumerate(zip(BUCKETS_MS + (None,), self.buckets)) if n
+            },
+        }
+
+
+_lock = threading.Lock()
+_histograms = {}    # name -> Histogram
+_counters = {}      # name -> int
+_active = threading.local()   # per-thread stack of running operations
+
+
+def enable(on: bool = True) -> None:
+    global ENABLED
+    ENABLED = on
+
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def observe(name: str, seconds: float) -> None:
+    """Record one latency sample for `name`."""
+    if not ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds * 1000)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add to counter `name`."""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def record_query() -> None:
+    """Called for every SQL statement; charged to each running operation."""
+    if not ENABLED:
+        return
+    stack = getattr(_active, "stack", None)
+    if stack:
+        for frame in stack:
+            frame["queries"] += 1
+    else:
+        count("sql.queries.outside_operations")
+
+
+def instrument(prefix: str, count_rows: bool = True):
+    """
+    Decorator: time the call as "<prefix>.<function name>" and count the SQL
+    statements it runs and, for list / dict results, the rows it returns
+    (pass count_rows=False for functions that return a single record).
+    """
+    def decorator(function):
+        name = f"{prefix}.{function.__name__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            stack = getattr(_active, "stack", None)
+            if stack is None:
+                stack = _active.stack = []
+            frame = {"queries": 0}
+            stack.append(frame)
+            started = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - started)
+                stack.pop()
+                count(f"{name}.queries", frame["queries"])
+            if count_rows and isinstance(result, (list, dict)):
+                count(f"{name}.rows", len(result))
+            return result
+        return wrapper
+    return decorator
+
+
+def running_operations() -> list:
+    """The calling thread's running operations, for work done on its behalf."""
+    return list(getattr(_active, "stack", None) or ())
+
+
+class charged_to:
+    """
+    Context manager: charge SQL statements run in this thread to operations
+    captured with running_operations() in another (e.g. the storage writer).
+    """
+
+    __slots__ = ("operations", "saved")
+
+    def __init__(self, operations: list):
+        self.operations = operations
+
+    def __enter__(self):
+        self.saved = getattr(_active, "stack", None)
+        _active.stack = self.operations
+        return self
+
+    def __exit__(self, *exc_info):
+        _active.stack = self.saved
+        return False
+
+
+class timer:
+    """Context manager: `with metrics.timer("site.build"): ...`."""
+
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter() if ENABLED else None
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.started is not None:
+            observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def snapshot() -> dict:
+    """All histograms and counters as plain data."""
+    with _lock:
+        return {
+            "enabled": ENABLED,
+            "histograms": {name: h.to_dict() for name, h in sorted(_histograms.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def dump_json(path: str) -> None:
+    """Write snapshot() to a JSON file for offline analysis."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(snapshot(), dumped_at=time.time()), f, indent=2)
+
+
+def format_report() -> str:
+    """Human-readable table of the current metrics."""
+    data = snapshot()
+    lines = []
+    if data["histograms"]:
+        lines.append(f"{'operation':42} {'count':>7} {'avg ms':>9} {'p50 ms':>8} "
+                     f"{'p95 ms':>8} {'max ms':>9}")
+        for name, h in data["histograms"].items():
+            lines.append(f"{name:42} {h['count']:7} {h['avg_ms']:9.2f} {h['p50_ms']:8g} "
+                         f"{h['p95_ms']:8g} {h['max_ms']:9.2f}")
+    if data["counters"]:
+        lines.append("")
+        for name, value in data["counters"].items():
+            lines.append(f"{name:42} {value:7}")
+    if not lines:
+        lines.append("No metrics recorded yet.")
+    return "\n".join(lines)
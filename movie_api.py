@@ -3,12 +3,380 @@
 # Handles communication with the OMDb API for Movie Project
 # ---------------------------------------------------------
 
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
 
 # This is the OMDb API key for this project
 API_KEY = "4134f61f"  # replace with your own key if needed
 BASE_URL = "http://www.omdbapi.com/"
 
+# ---------- HTTP CLIENT ----------
+
+class OmdbClient:
+    """
+    Reusable OMDb client.
+    - One requests.Session with a connection pool, so lookups reuse keep-alive connections.
+    - Connect/read timeouts, so a stalled request can't hang the CLI.
+    - Exponential backoff on 429 and 5xx responses (honours Retry-After).
+    - Per-request latency metrics, see stats().
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, base_url: str = BASE_URL, api_key: str = API_KEY,
+                 connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 max_retries: int = 3, backoff_factor: float = 0.5,
+                 max_backoff: float = 30.0, pool_size: int = 10):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._metrics_lock = threading.Lock()
+        self.latencies = []     # seconds, one entry per HTTP attempt
+        self.statuses = {}      # status code (or "error") -> count
+        self.retries = 0
+
+    def _record(self, started: float, status) -> None:
+        elapsed = time.perf_counter() - started
+        with self._metrics_lock:
+            self.latencies.append(elapsed)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        metrics.observe("omdb.request", elapsed)
+        metrics.count(f"omdb.status.{status}")
+
+    def _backoff(self, attempt: int, response=None) -> float:
+        """Seconds to wait before the next attempt."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        return min(self.backoff_factor * (2 ** attempt), self.max_backoff)
+
+    def get_movie(self, title: str) -> dict:
+        """
+        Returns the decoded OMDb JSON payload for a title.
+        Raises requests.exceptions.RequestException once retries are used up.
+        """
+        params = {"apikey": self.api_key, "t": title}
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self._record(started, "error")
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                self._record(started, response.status_code)
+                if response.status_code not in self.RETRY_STATUSES:
+                    return response.json()
+                if attempt >= self.max_retries:
+                    response.raise_for_status()
+                delay = self._backoff(attempt, response)
+
+            with self._metrics_lock:
+                self.retries += 1
+            metrics.count("omdb.retries")
+            attempt += 1
+            time.sleep(delay)
+
+    def stats(self) -> dict:
+        """Summary of request latencies (milliseconds) and response codes."""
+        with self._metrics_lock:
+            latencies = sorted(self.latencies)
+            statuses = dict(self.statuses)
+            retries = self.retries
+        count = len(latencies)
+        if count == 0:
+            return {"requests": 0, "retries": retries, "statuses": statuses}
+        return {
+            "requests": count,
+            "retries": retries,
+            "statuses": statuses,
+            "avg_ms": sum(latencies) / count * 1000,
+            "p50_ms": latencies[count // 2] * 1000,
+            "p95_ms": latencies[min(count - 1, int(count * 0.95))] * 1000,
+            "max_ms": latencies[-1] * 1000,
+        }
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OmdbClient:
+    """Returns the shared OmdbClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OmdbClient()
+        return _client
+
+
+def set_client(client: OmdbClient) -> None:
+    """Replaces the shared client (e.g. one pointed at a local test server)."""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+# ---------- RESPONSE CACHE SETTINGS ----------
+
+# Cache lives next to the movies database (data/omdb_cache.db)
+CACHE_PATH = os.path.join("data", "omdb_cache.db")
+CACHE_ENABLED = True
+CACHE_TTL = 7 * 24 * 60 * 60        # found movies: keep for a week
+NEGATIVE_CACHE_TTL = 60 * 60        # "Movie not found": retry after an hour
+CACHE_MAX_ENTRIES = 10_000          # least recently used entries are evicted
+CACHE_TOUCH_INTERVAL = 60 * 60      # a hit re-stamps last_used at most this often
+
+# The only error answer worth remembering; others ("Invalid API key!",
+# "Request limit reached!") say nothing about the title and are not cached
+NOT_FOUND_ERROR = "Movie not found!"
+
+
+def normalize_title(title: str) -> str:
+    """Returns the cache key for a title: trimmed, casefolded, single-spaced."""
+    return " ".join(title.split()).casefold()
+
+
+# ---------- PERSISTENT CACHE ----------
+
+# One connection for the process, opened on first use, in WAL mode so that
+# commits are cheap and other processes can read while we write. sqlite3
+# connections aren't safe to share between threads, hence _cache_lock; it
+# is only held for the statements, never for an HTTP request.
+_cache_lock = threading.Lock()
+_cache_connection = None
+_cache_connection_path = None   # CACHE_PATH the connection was opened for
+
+
+def _cache_connect():
+    """Returns the cache DB connection, creating the folder and table on first use."""
+    global _cache_connection, _cache_connection_path
+    if _cache_connection is not None and _cache_connection_path == CACHE_PATH:
+        return _cache_connection
+    if _cache_connection is not None:
+        _cache_connection.close()
+    folder = os.path.dirname(CACHE_PATH)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    connection = sqlite3.connect(CACHE_PATH, timeout=10, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS omdb_cache (
+            key TEXT PRIMARY KEY,
+            found INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+    """)
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_omdb_cache_last_used ON omdb_cache (last_used)"
+    )
+    connection.commit()
+    _cache_connection, _cache_connection_path = connection, CACHE_PATH
+    return connection
+
+
+def close_cache() -> None:
+    """Closes the cache DB connection; the next cache call reopens it."""
+    global _cache_connection
+    with _cache_lock:
+        if _cache_connection is not None:
+            _cache_connection.close()
+            _cache_connection = None
+
+
+def cache_get(key: str):
+    """
+    Returns the cached OMDb payload (a dict) for a key, or None on miss/expiry.
+    A hit refreshes the entry's last_used time for LRU eviction, unless it
+    was refreshed less than CACHE_TOUCH_INTERVAL ago: most hits only read.
+    """
+    now = time.time()
+    with _cache_lock:
+        connection = _cache_connect()
+        row = connection.execute(
+            "SELECT found, payload, fetched_at, last_used FROM omdb_cache WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        found, payload, fetched_at, last_used = row
+        ttl = CACHE_TTL if found else NEGATIVE_CACHE_TTL
+        if now - fetched_at > ttl:
+            with connection:
+                connection.execute("DELETE FROM omdb_cache WHERE key = ?", (key,))
+            return None
+        if now - last_used >= CACHE_TOUCH_INTERVAL:
+            with connection:
+                connection.execute(
+                    "UPDATE omdb_cache SET last_used = ? WHERE key = ?", (now, key)
+                )
+    return json.loads(payload)
+
+
+def cache_put(key: str, data: dict) -> None:
+    """
+    Stores an OMDb payload and evicts the least recently used overflow.
+    Error payloads other than NOT_FOUND_ERROR are not stored.
+    """
+    now = time.time()
+    found = 0 if data.get("Response") == "False" else 1
+    if not found and data.get("Error") != NOT_FOUND_ERROR:
+        return
+    payload = json.dumps(data)
+    with _cache_lock:
+        connection = _cache_connect()
+        with connection:   # commits, or rolls back on error
+            connection.execute(
+                """
+                INSERT OR REPLACE INTO omdb_cache (key, found, payload, fetched_at, last_used)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, found, payload, now, now),
+            )
+            connection.execute(
+                """
+                DELETE FROM omdb_cache WHERE key IN (
+                    SELECT key FROM omdb_cache
+                    ORDER BY last_used DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (CACHE_MAX_ENTRIES,),
+            )
+
+
+def clear_cache() -> None:
+    """Removes every cached OMDb response."""
+    with _cache_lock:
+        connection = _cache_connect()
+        with connection:
+            connection.execute("DELETE FROM omdb_cache")
+
+
+# ---------- SINGLE-FLIGHT LOOKUPS ----------
+
+# key -> {"event": threading.Event, "data": dict | None, "error": Exception | None}
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def _request_omdb(title: str) -> dict:
+    """Performs the actual HTTP call and returns the decoded JSON payload."""
+    return get_client().get_movie(title)
+
+
+def _lookup(title: str) -> dict:
+    """
+    Returns the OMDb payload for a title, from the cache when possible.
+    Concurrent lookups of the same title share a single HTTP request.
+    """
+    if not CACHE_ENABLED:
+        return _request_omdb(title)
+
+    key = normalize_title(title)
+    cached = cache_get(key)
+    if cached is not None:
+        metrics.count("omdb.cache.hit")
+        return cached
+    metrics.count("omdb.cache.miss")
+
+    with _in_flight_lock:
+        call = _in_flight.get(key)
+        leader = call is None
+        if leader:
+            call = {"event": threading.Event(), "data": None, "error": None}
+            _in_flight[key] = call
+
+    if not leader:
+        metrics.count("omdb.single_flight.shared")
+        call["event"].wait()
+        if call["error"] is not None:
+            raise call["error"]
+        return call["data"]
+
+    try:
+        # A leader that finished between our miss above and now stored its answer
+        data = cache_get(key)
+        if data is None:
+            data = _request_omdb(title)
+            cache_put(key, data)
+        call["data"] = data
+        return data
+    except Exception as e:
+        call["error"] = e
+        raise
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+        call["event"].set()
+
+
+# ---------- PUBLIC API ----------
+
+def parse_movie(data: dict):
+    """
+    Converts an OMDb payload into (year, rating, poster_url); None where missing.
+    Series have ranged years ("1994–2004"); their first year is used.
+    """
+    year_match = re.match(r"\s*(\d{4})", data.get("Year") or "")
+    year = int(year_match.group(1)) if year_match else None
+    rating = float(data.get("imdbRating", 0)) if data.get("imdbRating") != "N/A" else None
+    poster_url = data.get("Poster", None) if data.get("Poster") != "N/A" else None
+    return year, rating, poster_url
+
+
+def lookup_movie(title: str):
+    """
+    Quiet variant of fetch_movie for batch jobs.
+    Returns (year, rating, poster_url), or None if OMDb does not know the title.
+    Network errors are raised as requests.exceptions.RequestException.
+    """
+    data = _lookup(title)
+    if data.get("Response") == "False":
+        return None
+    return parse_movie(data)
+
+
+def refresh_movie(title: str):
+    """
+    Like lookup_movie, but always asks OMDb (skipping the cache) and stores
+    the fresh answer in the cache. Used by the rating refresh job.
+    """
+    data = _request_omdb(title)
+    if CACHE_ENABLED:
+        cache_put(normalize_title(title), data)
+    if data.get("Response") == "False":
+        return None
+    return parse_movie(data)
+
 
 def fetch_movie(title: str):
     """
@@ -16,19 +384,14 @@ def fetch_movie(title: str):
     Returns (year, rating, poster_url) or (None, None, None) on failure.
     """
     try:
-        response = requests.get(BASE_URL, params={"apikey": API_KEY, "t": title})
-        data = response.json()
+        data = _lookup(title)
 
         # Check if movie was found
         if data.get("Response") == "False":
             print(f"Error: {data.get('Error', 'Movie not found')}")
             return None, None, None
 
-        year = int(data.get("Year", 0)) if data.get("Year") else None
-        rating = float(data.get("imdbRating", 0)) if data.get("imdbRating") != "N/A" else None
-        poster_url = data.get("Poster", None) if data.get("Poster") != "N/A" else None
-
-        return year, rating, poster_url
+        return parse_movie(data)
 
     except requests.exceptions.RequestException as e:
         print(f"Network error while accessing OMDb API: {e}")
@@ -5,8 +5,8 @@
 # ---------------------------------------------------------
 
 from __future__ import annotations
-import random
 
+import metrics                                # diagnostics menu
 import storage.movie_storage_sql as storage   # switched from JSON to SQL storage
 import website_generator                      # for generating website
 
@@ -19,6 +19,12 @@ YELLOW  = "\033[33m"
 CYAN    = "\033[36m"
 MAGENTA = "\033[35m"
 
+# Movies shown per page by "List movies"
+PAGE_SIZE = 20
+
+# Where the Diagnostics menu dumps metrics as JSON
+METRICS_FILE = "data/metrics.json"
+
 # Track the currently logged-in user (set in select_user)
 current_user_id: int | None = None
 current_username: str | None = None
@@ -90,6 +96,7 @@ def print_menu() -> None:
     print(f"{YELLOW}10. Filter movies{RESET}")
     print(f"{YELLOW}11. Generate website{RESET}")
     print(f"{YELLOW}12. Switch user{RESET}")  # NEW
+    print(f"{YELLOW}13. Diagnostics{RESET}")
 
 
 # ---------- INPUT HELPERS ----------
@@ -156,14 +163,37 @@ def prompt_optional_int(prompt_text: str) -> int | None:
 # ---------- MOVIE ACTIONS ----------
 
 def list_movies() -> None:
-    """Lists all movies stored in the database for the current user."""
-    movies = storage.list_movies(current_user_id)
-    if not movies:
+    """Lists the current user's movies one page at a time (n = next, p = previous, q = quit)."""
+    total = storage.count_movies(current_user_id)
+    if total == 0:
         print(f"{current_username}, your movie collection is empty.")
         return
-    print(f"\n{len(movies)} movie(s) in total")
-    for title, info in movies.items():
-        print(f"{title} ({info.get('year', 'Unknown')}): {info.get('rating', 'N/A')}")
+    print(f"\n{total} movie(s) in total")
+
+    page_count = (total + PAGE_SIZE - 1) // PAGE_SIZE
+    page_number = 1
+    page = storage.list_movies_page(current_user_id, PAGE_SIZE)
+    while True:
+        for movie in page:
+            print(f"{movie['title']} ({movie.get('year', 'Unknown')}): {movie.get('rating', 'N/A')}")
+        if page_count == 1:
+            return
+
+        print(f"{CYAN}-- Page {page_number}/{page_count} --{RESET}")
+        user_choice = input("n = next, p = previous, q = back to menu: ").strip().lower()
+        if user_choice == "n" and page_number < page_count:
+            next_page = storage.list_movies_page(
+                current_user_id, PAGE_SIZE, after=(page[-1]["title"], page[-1]["id"]))
+            if next_page:
+                page, page_number = next_page, page_number + 1
+        elif user_choice == "p" and page_number > 1:
+            page = storage.list_movies_page(
+                current_user_id, PAGE_SIZE, before=(page[0]["title"], page[0]["id"]))
+            page_number -= 1
+        elif user_choice in {"q", ""}:
+            return
+        else:
+            print(f"{RED}Nothing there. Please enter 'n', 'p' or 'q'.{RESET}")
 
 
 def add_movie() -> None:
@@ -206,80 +236,51 @@ def update_movie() -> None:
 
 # ---------- STATS AND TOOLS ----------
 
-def _compute_average_and_median(ratings: list[float]) -> tuple[float, float]:
-    """Helper function: computes average and median from a list of ratings."""
-    count = len(ratings)
-    if count == 0:
-        return (0.0, 0.0)
-    average_value = sum(ratings) / count
-    sorted_ratings = sorted(ratings)
-    if count % 2 == 1:
-        median_value = sorted_ratings[count // 2]
-    else:
-        left = sorted_ratings[count // 2 - 1]
-        right = sorted_ratings[count // 2]
-        median_value = (left + right) / 2.0
-    return (average_value, median_value)
-
-
 def print_statistics() -> None:
     """Prints average, median, best, and worst movie ratings for current user."""
-    movies = storage.list_movies(current_user_id)
-    if not movies:
+    stats = storage.get_user_stats(current_user_id)
+    if stats is None:
         print("No movies found.")
         return
-    ratings = [float(info.get("rating", 0.0)) for info in movies.values()]
-    average_rating, median_rating = _compute_average_and_median(ratings)
-    highest_rating = max(ratings)
-    lowest_rating = min(ratings)
-    best_titles = [t for t, i in movies.items() if float(i.get("rating", 0.0)) == highest_rating]
-    worst_titles = [t for t, i in movies.items() if float(i.get("rating", 0.0)) == lowest_rating]
-    print(f"\nAverage rating: {average_rating:.1f}")
-    print(f"Median rating: {median_rating:.1f}")
-    print(f"Best movie: {', '.join(best_titles)}, {highest_rating:.1f}")
-    print(f"Worst movie: {', '.join(worst_titles)}, {lowest_rating:.1f}")
+    print(f"\nAverage rating: {stats['average']:.1f}")
+    print(f"Median rating: {stats['median']:.1f}")
+    print(f"Best movie: {', '.join(stats['best_titles'])}, {stats['max']:.1f}")
+    print(f"Worst movie: {', '.join(stats['worst_titles'])}, {stats['min']:.1f}")
 
 
 def random_movie() -> None:
     """Displays a random movie from the current user's database."""
-    movies = storage.list_movies(current_user_id)
-    if not movies:
+    movie = storage.random_movie(current_user_id)
+    if movie is None:
         print("No movies found.")
         return
-    random_title = random.choice(list(movies.keys()))
-    info = movies[random_title]
-    print(f"\n{random_title} ({info.get('year', 'Unknown')}): {info.get('rating', 'N/A')}")
+    print(f"\n{movie['title']} ({movie.get('year', 'Unknown')}): {movie.get('rating', 'N/A')}")
 
 
 def search_movie() -> None:
-    """Searches for movies containing a given substring in the title (for current user)."""
-    query = prompt_non_empty_string("Enter part of the movie title to search: ").lower()
-    movies = storage.list_movies(current_user_id)
-    matches = [f"{t} ({i.get('year','Unknown')}): {i.get('rating','N/A')}"
-               for t, i in movies.items() if query in t.lower()]
-    if matches:
-        for line in matches:
-            print(line)
+    """Searches the current user's titles (word prefixes, best matches first)."""
+    query = prompt_non_empty_string("Enter part of the movie title to search: ")
+    movies = storage.search_movies(current_user_id, query)
+    if movies:
+        for title, info in movies.items():
+            print(f"{title} ({info.get('year', 'Unknown')}): {info.get('rating', 'N/A')}")
     else:
         print("No matches found.")
 
 
 def sort_movies_by_rating() -> None:
     """Sorts and displays movies by rating in descending order (current user only)."""
-    movies = storage.list_movies(current_user_id)
+    movies = storage.query_movies(current_user_id, sort_by="rating", descending=True)
     if not movies:
         print("No movies found.")
         return
-    titles_sorted = sorted(movies.keys(), key=lambda t: float(movies[t].get("rating", 0.0)), reverse=True)
-    for title in titles_sorted:
-        info = movies[title]
+    for title, info in movies.items():
         print(f"{title} ({info.get('year', 'Unknown')}): {info.get('rating', 'N/A')}")
 
 
 def sort_movies_chronological() -> None:
     """Sorts and displays movies by release year (ascending or descending)."""
-    movies = storage.list_movies(current_user_id)
-    if not movies:
+    if storage.count_movies(current_user_id) == 0:
         print("No movies found.")
         return
     while True:
@@ -288,37 +289,53 @@ def sort_movies_chronological() -> None:
             break
         print(f"{RED}Please enter 'y' or 'n'.{RESET}")
     reverse_order = True if user_choice == "y" else False
-    titles_sorted = sorted(movies.keys(), key=lambda t: int(movies[t].get("year", 0)), reverse=reverse_order)
-    for title in titles_sorted:
-        info = movies[title]
+    movies = storage.query_movies(current_user_id, sort_by="year", descending=reverse_order)
+    for title, info in movies.items():
         print(f"{title} ({info.get('year', 'Unknown')}): {info.get('rating', 'N/A')}")
 
 
 def filter_movies() -> None:
     """Filters movies based on optional min rating, start year, and end year (for current user)."""
-    movies = storage.list_movies(current_user_id)
-    if not movies:
+    if storage.count_movies(current_user_id) == 0:
         print("No movies found.")
         return
     min_rating = prompt_optional_float("Enter minimum rating (leave blank for no minimum rating): ")
     start_year = prompt_optional_int("Enter start year (leave blank for no start year): ")
     end_year = prompt_optional_int("Enter end year (leave blank for no end year): ")
 
-    filtered_lines = []
+    movies = storage.query_movies(current_user_id, min_rating=min_rating,
+                                  start_year=start_year, end_year=end_year)
+
+    print("Filtered Movies:" if movies else "No movies match the filters.")
     for title, info in movies.items():
-        rating_value = float(info.get("rating", 0.0))
-        year_value = int(info.get("year", 0))
-        if min_rating is not None and rating_value < min_rating:
-            continue
-        if start_year is not None and year_value < start_year:
-            continue
-        if end_year is not None and year_value > end_year:
-            continue
-        filtered_lines.append(f"{title} ({year_value}): {rating_value}")
+        print(f"{title} ({info['year']}): {float(info['rating'])}")
+
+
+# ---------- DIAGNOSTICS ----------
+
+def show_diagnostics() -> None:
+    """Shows collected metrics and lets the user toggle, reset or dump them."""
+    state = "ON" if metrics.ENABLED else "OFF"
+    print(f"\n{CYAN}Diagnostics (metrics are {state}){RESET}\n")
+    print(metrics.format_report())
+
+    cache = storage.collection_cache_stats()
+    print(f"\nCollection cache: {cache['hits']} hit(s), {cache['misses']} miss(es), "
+          f"{cache['users']} user(s) / {cache['movies']} movie(s) cached")
 
-    print("Filtered Movies:" if filtered_lines else "No movies match the filters.")
-    for line in filtered_lines:
-        print(line)
+    print(f"\n{YELLOW}t. Turn metrics {'off' if metrics.ENABLED else 'on'}{RESET}")
+    print(f"{YELLOW}r. Reset metrics{RESET}")
+    print(f"{YELLOW}d. Dump metrics to {METRICS_FILE}{RESET}")
+    user_choice = input("Choose an option (or press Enter to go back): ").strip().lower()
+    if user_choice == "t":
+        metrics.enable(not metrics.ENABLED)
+        print(f"Metrics are now {'ON' if metrics.ENABLED else 'OFF'}.")
+    elif user_choice == "r":
+        metrics.reset()
+        print("Metrics reset.")
+    elif user_choice == "d":
+        metrics.dump_json(METRICS_FILE)
+        print(f"{GREEN}Metrics written to {METRICS_FILE}.{RESET}")
 
 
 # ---------- MENU HANDLER ----------
@@ -352,8 +369,10 @@ def handle_menu_choice(user_choice: str) -> bool:
         website_generator.generate_website(current_user_id, current_username)
     elif user_choice == "12":
         select_user()  # NEW
+    elif user_choice == "13":
+        show_diagnostics()
     else:
-        print(f"{RED}Invalid choice, please enter a number between 0 and 12.{RESET}")
+        print(f"{RED}Invalid choice, please enter a number between 0 and 13.{RESET}")
     return True
 
 
@@ -365,7 +384,7 @@ def main() -> None:
     while True:
         print_menu()
         try:
-            user_choice = input(f"{GREEN}Enter choice (0-12): {RESET}").strip()
+            user_choice = input(f"{GREEN}Enter choice (0-13): {RESET}").strip()
         except (EOFError, KeyboardInterrupt):
             print(f"\n{MAGENTA}Bye!{RESET}")
             break
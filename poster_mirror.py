@@ -0,0 +1,174 @@
+# ---------------------------------------------------------
+# poster_mirror.py
+# Downloads movie posters into _static/posters so generated
+# websites load from local files instead of third-party CDNs
+# ---------------------------------------------------------
+#
+# Files are content-addressed: posters/<first 2 hex>/<sha256>.<ext>, so the
+# same image shared by many URLs is stored once. Which URL maps to which file
+# is kept in the poster_mirror table; URLs already mirrored (and still on
+# disk) are never downloaded again; a thumbnail gone from disk is rebuilt
+# from the local original. Thumbnails need Pillow; without it the full-size
+# copy is used.
+
+from __future__ import annotations
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from io import BytesIO
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import storage.movie_storage_sql as storage
+
+try:
+    from PIL import Image
+except ImportError:   # thumbnails are optional
+    Image = None
+
+STATIC_FOLDER = "_static"
+POSTER_FOLDER = "posters"                 # relative to STATIC_FOLDER
+THUMBNAIL_SIZE = (128, 193)               # same box as .movie-poster in style.css
+TIMEOUT = (3.05, 20.0)                    # connect, read (seconds)
+MAX_POSTER_BYTES = 10 * 1024 * 1024
+
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size: int = 16) -> requests.Session:
+    """Shared keep-alive session for poster downloads."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def _write_file(path: str, content: bytes) -> None:
+    """Write bytes via a temp file + rename, so a crash never leaves half a poster."""
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _make_thumbnail(content: bytes, path: str) -> bool:
+    """Write a JPEG thumbnail of the poster; False if Pillow is missing or fails."""
+    if Image is None:
+        return False
+    try:
+        with Image.open(BytesIO(content)) as image:
+            image.thumbnail(THUMBNAIL_SIZE)
+            buffer = BytesIO()
+            image.convert("RGB").save(buffer, "JPEG", quality=85, optimize=True)
+    except (OSError, ValueError):
+        return False
+    _write_file(path, buffer.getvalue())
+    return True
+
+
+def download_poster(url: str):
+    """
+    Download one poster and store it content-addressed.
+    Returns a poster_mirror row dict, or None if the download failed.
+    """
+    try:
+        response = get_session().get(url, timeout=TIMEOUT)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"Could not download poster {url}: {e}")
+        return None
+    content = response.content
+    if not content or len(content) > MAX_POSTER_BYTES:
+        print(f"Skipping poster {url}: unexpected size {len(content)} bytes")
+        return None
+
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+    extension = EXTENSIONS.get(content_type, ".jpg")
+    digest = hashlib.sha256(content).hexdigest()
+    folder = f"{POSTER_FOLDER}/{digest[:2]}"
+
+    path = f"{folder}/{digest}{extension}"
+    if not os.path.exists(os.path.join(STATIC_FOLDER, path)):
+        _write_file(os.path.join(STATIC_FOLDER, path), content)
+
+    thumbnail_path = f"{folder}/{digest}.thumb.jpg"
+    if not os.path.exists(os.path.join(STATIC_FOLDER, thumbnail_path)):
+        if not _make_thumbnail(content, os.path.join(STATIC_FOLDER, thumbnail_path)):
+            thumbnail_path = None
+
+    return {
+        "url": url,
+        "path": path,
+        "thumbnail_path": thumbnail_path,
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _restore_thumbnail(entry) -> dict:
+    """
+    Rebuild a mirrored poster's missing thumbnail from the local original.
+    Returns the entry to record: thumbnail_path is None if that fails.
+    """
+    with open(os.path.join(STATIC_FOLDER, entry["path"]), "rb") as f:
+        content = f.read()
+    if _make_thumbnail(content, os.path.join(STATIC_FOLDER, entry["thumbnail_path"])):
+        return dict(entry)
+    return dict(entry, thumbnail_path=None)
+
+
+def _local_src(entry) -> str:
+    return entry["thumbnail_path"] or entry["path"]
+
+
+def mirror_posters(urls, workers: int = 8) -> dict:
+    """
+    Make sure every URL has a local copy, downloading missing ones in a
+    bounded thread pool. Returns {url: src relative to _static}; URLs that
+    could not be downloaded are left out.
+    """
+    urls = {url for url in urls if url and url != "None"}
+    known = storage.get_mirrored_posters(urls)
+    local = {}
+    missing = []
+    repaired = []
+    for url in urls:
+        entry = known.get(url)
+        if entry and os.path.exists(os.path.join(STATIC_FOLDER, entry["path"])):
+            thumbnail_path = entry["thumbnail_path"]
+            if thumbnail_path and not os.path.exists(os.path.join(STATIC_FOLDER, thumbnail_path)):
+                entry = _restore_thumbnail(entry)
+                repaired.append(entry)
+            local[url] = _local_src(entry)
+        else:
+            missing.append(url)
+
+    storage.record_mirrored_posters(repaired)
+    if missing:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            downloaded = [entry for entry in pool.map(download_poster, missing) if entry]
+        storage.record_mirrored_posters(downloaded)
+        for entry in downloaded:
+            local[entry["url"]] = _local_src(entry)
+    return local
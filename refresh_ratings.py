@@ -0,0 +1,145 @@
+# ---------------------------------------------------------
+# refresh_ratings.py
+# Refreshes stored IMDb ratings from OMDb for every user
+#
+# Usage:
+#   python3 refresh_ratings.py --max-age-days 30
+#   python3 refresh_ratings.py --resume
+# ---------------------------------------------------------
+#
+# Many users own the same titles, so the job looks up each distinct title
+# (case-insensitive) once and writes the answer to the shared catalog with one
+# UPDATE per title, to the entry of the year OMDb answered with; users who set
+# their own rating keep it. Lookups run on an
+# asyncio event loop: a semaphore bounds how many are in flight, a shared
+# limiter caps requests per second, and each blocking OMDb call runs on a
+# worker thread through the pooled OmdbClient.
+#
+# Progress is durable: every flushed batch stamps rating_refreshed_at, and the
+# run is recorded in refresh_runs. After an interruption, --resume reuses the
+# unfinished run's cutoff, so only titles that were not written yet are fetched.
+
+from __future__ import annotations
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+import movie_api
+import storage.movie_storage_sql as storage
+
+
+class AsyncRateLimiter:
+    """Lets at most `rate` calls per second through, shared by all tasks."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+
+    async def wait(self) -> None:
+        """Sleeps until the caller's turn comes up."""
+        now = time.monotonic()
+        slot = max(self.next_slot, now)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+async def fetch_ratings(titles, concurrency: int = 8, rate: float = 10.0):
+    """
+    Looks up every title on OMDb concurrently.
+    Yields (title, year, rating) as answers arrive; rating is None when OMDb
+    knows the title but has no rating, year and rating are None when OMDb
+    does not know it. A title whose request failed, or whose answer could
+    not be read, is reported and skipped (left for the next run).
+    """
+    limiter = AsyncRateLimiter(rate)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(title):
+        async with semaphore:
+            await limiter.wait()
+            try:
+                movie = await asyncio.to_thread(movie_api.refresh_movie, title)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Could not refresh '{title}': {e}")
+                return title, None, None, False
+        if movie is None:
+            print(f"OMDb no longer knows '{title}'; keeping its rating.")
+            return title, None, None, True
+        return title, movie[0], movie[1], True
+
+    # Schedule in windows so a huge catalog doesn't create every task at once
+    window = concurrency * 50
+    for start in range(0, len(titles), window):
+        tasks = [asyncio.ensure_future(fetch(title)) for title in titles[start:start + window]]
+        for next_done in asyncio.as_completed(tasks):
+            title, year, rating, ok = await next_done
+            if ok:
+                yield title, year, rating
+
+
+async def refresh_ratings(cutoff: str, concurrency: int = 8, rate: float = 10.0,
+                          batch_size: int = 100):
+    """
+    Refreshes every title with a catalog entry older than `cutoff` (ISO timestamp).
+    Results are written every `batch_size` titles.
+    Returns (titles refreshed, catalog entries updated).
+    """
+    titles = storage.stale_titles(cutoff)
+    print(f"{len(titles)} distinct title(s) to refresh.")
+    refreshed_titles = 0
+    updated_entries = 0
+    batch = []
+    async for result in fetch_ratings(titles, concurrency, rate):
+        batch.append(result)
+        if len(batch) >= batch_size:
+            updated_entries += storage.apply_rating_refresh(batch, cutoff, _now())
+            refreshed_titles += len(batch)
+            batch = []
+    if batch:
+        updated_entries += storage.apply_rating_refresh(batch, cutoff, _now())
+        refreshed_titles += len(batch)
+    return refreshed_titles, updated_entries
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Refresh stored ratings from OMDb.")
+    parser.add_argument("--max-age-days", type=float, default=0.0,
+                        help="only refresh entries refreshed longer ago than this (default: all)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the last interrupted run instead of starting a new one")
+    parser.add_argument("--concurrency", type=int, default=8, help="OMDb lookups in flight")
+    parser.add_argument("--rate", type=float, default=10.0, help="max OMDb requests per second")
+    parser.add_argument("--batch-size", type=int, default=100, help="titles per transaction")
+    args = parser.parse_args(argv)
+
+    run = storage.get_unfinished_refresh_run() if args.resume else None
+    if run is not None:
+        print(f"Resuming refresh started at {run['started_at']}.")
+        run_id, cutoff = run["id"], run["cutoff"]
+    else:
+        if args.resume:
+            print("No interrupted refresh to resume; starting a new one.")
+        started_at = _now()
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=args.max_age_days)).isoformat()
+        run_id = storage.start_refresh_run(cutoff, started_at)
+
+    started = time.perf_counter()
+    titles, entries = asyncio.run(
+        refresh_ratings(cutoff, args.concurrency, args.rate, args.batch_size))
+    storage.finish_refresh_run(run_id, _now())
+    print(f"Refreshed {titles} title(s), {entries} catalog entries in "
+          f"{time.perf_counter() - started:.1f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# storage/columns.py
+# Compact, column-oriented form of a movie collection.
+#
+# Ratings and years live in typed arrays (8 and 4 bytes per movie), titles
+# (interned, so collections loaded side by side share them) and posters in
+# plain lists, instead of one dict per movie. Stats, sorting and filtering run
+# over whole columns with builtins (sum, sorted, map, itertools.compress),
+# which loop in C. NumPy is optional: when it is installed, as_numpy() returns
+# zero-copy views, and where() / order_by() use masks and argsort over them.
+from __future__ import annotations
+import itertools
+import operator
+import statistics
+import sys
+from array import array
+
+try:
+    import numpy
+except ImportError:   # optional, see the module comment
+    numpy = None
+
+# SQLite's NOCASE folds ASCII letters only; match it exactly
+_NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+class Movie:
+    """One row of a MovieColumns, for callers that want attribute access."""
+
+    __slots__ = ("id", "title", "year", "rating", "poster_url")
+
+    def __init__(self, id, title, year, rating, poster_url):
+        self.id = id
+        self.title = title
+        self.year = year
+        self.rating = rating
+        self.poster_url = poster_url
+
+    def __repr__(self):
+        return f"Movie({self.title!r}, {self.year}, {self.rating})"
+
+
+class MovieColumns:
+    """
+    Parallel columns of one collection: ids, titles, years, ratings and
+    poster_urls, all the same length and in the same row order.
+    """
+
+    __slots__ = ("ids", "titles", "years", "ratings", "poster_urls")
+
+    def __init__(self, ids=None, titles=None, years=None, ratings=None, poster_urls=None):
+        self.ids = ids if ids is not None else array("q")
+        self.titles = titles if titles is not None else []
+        self.years = years if years is not None else array("i")
+        self.ratings = ratings if ratings is not None else array("d")
+        self.poster_urls = poster_urls if poster_urls is not None else []
+
+    def extend(self, rows) -> None:
+        """Append (id, title, year, rating, poster_url) rows."""
+        rows = list(rows)
+        if not rows:
+            return
+        ids, titles, years, ratings, poster_urls = zip(*rows)
+        self.ids.extend(ids)
+        self.titles.extend(map(sys.intern, titles))
+        self.years.extend(years)
+        self.ratings.extend(ratings)
+        self.poster_urls.extend(poster_urls)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row(self, index: int) -> Movie:
+        return Movie(self.ids[index], self.titles[index], self.years[index],
+                     self.ratings[index], self.poster_urls[index])
+
+    def __iter__(self):
+        return map(Movie, self.ids, self.titles, self.years, self.ratings, self.poster_urls)
+
+    def take(self, indices) -> MovieColumns:
+        """New MovieColumns holding the given rows, in the given order."""
+        indices = list(indices)
+        return MovieColumns(
+            array("q", map(self.ids.__getitem__, indices)),
+            list(map(self.titles.__getitem__, indices)),
+            array("i", map(self.years.__getitem__, indices)),
+            array("d", map(self.ratings.__getitem__, indices)),
+            list(map(self.poster_urls.__getitem__, indices)),
+        )
+
+    def to_dict(self) -> dict:
+        """The list_movies() shape: {title: {"year", "rating", "poster_url"}}."""
+        return dict(zip(self.titles, map(
+            lambda year, rating, poster_url: {"year": year, "rating": rating,
+                                              "poster_url": poster_url},
+            self.years, self.ratings, self.poster_urls)))
+
+    def as_numpy(self) -> dict:
+        """{"ids", "years", "ratings"} as NumPy arrays sharing this object's memory."""
+        if numpy is None:
+            raise RuntimeError("NumPy is not installed")
+        return {
+            "ids": numpy.frombuffer(self.ids, dtype=numpy.int64),
+            "years": numpy.frombuffer(self.years, dtype=numpy.int32),
+            "ratings": numpy.frombuffer(self.ratings, dtype=numpy.float64),
+        }
+
+    # ---------- ANALYTICS ----------
+
+    def statistics(self) -> dict | None:
+        """Same dict as storage.get_statistics(), or None for an empty collection."""
+        if not self.ratings:
+            return None
+        highest = max(self.ratings)
+        lowest = min(self.ratings)
+        return {
+            "count": len(self.ratings),
+            "average": sum(self.ratings) / len(self.ratings),
+            "median": statistics.median(self.ratings),
+            "min": lowest,
+            "max": highest,
+            "best_titles": list(itertools.compress(
+                self.titles, map(highest.__eq__, self.ratings))),
+            "worst_titles": list(itertools.compress(
+                self.titles, map(lowest.__eq__, self.ratings))),
+        }
+
+    def order_by(self, column: str, descending: bool = False) -> list[int]:
+        """
+        Row indices sorted by "rating", "year" or "title". Sorting is stable,
+        so rows loaded in title order stay alphabetical among equal values.
+        """
+        if column == "title":
+            values = [title.translate(_NOCASE) for title in self.titles]
+        elif column in ("rating", "year"):
+            values = getattr(self, column + "s")
+            if numpy is not None and values:
+                values = self.as_numpy()[column + "s"]
+                # Negating keeps equal values in row order, like sorted(reverse=True)
+                return numpy.argsort(-values if descending else values,
+                                     kind="stable").tolist()
+        else:
+            raise ValueError(f"Unknown sort key: {column!r}")
+        return sorted(range(len(values)), key=values.__getitem__, reverse=descending)
+
+    def where(self, min_rating=None, start_year=None, end_year=None) -> list[int]:
+        """Row indices passing the optional filters (same meaning as query_movies)."""
+        tests = []
+        if min_rating is not None:
+            tests.append(("ratings", operator.ge, min_rating))
+        if start_year is not None:
+            tests.append(("years", operator.ge, start_year))
+        if end_year is not None:
+            tests.append(("years", operator.le, end_year))
+        if numpy is not None and tests and len(self):
+            # One boolean mask over the zero-copy views
+            views = self.as_numpy()
+            mask = numpy.ones(len(self), dtype=bool)
+            for name, compare, bound in tests:
+                mask &= compare(views[name], bound)
+            return numpy.flatnonzero(mask).tolist()
+        # Each test only looks at the rows that passed the previous ones
+        indices = range(len(self))
+        for name, compare, bound in tests:
+            column = getattr(self, name)
+            values = column if len(indices) == len(column) else map(column.__getitem__, indices)
+            indices = list(itertools.compress(indices, map(compare, values, itertools.repeat(bound))))
+        return list(indices)
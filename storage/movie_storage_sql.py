@@ -1,59 +1,349 @@
 # storage/movie_storage_sql.py
-from sqlalchemy import create_engine, text
-
-# SQLite DB file will be created inside data/ folder
-DB_URL = "sqlite:///data/movies.db"
-
-# echo=True prints all SQL — keep ON while developing, OFF later if noisy
-engine = create_engine(DB_URL, echo=True)
-
-# Create the tables once (safe to run multiple times)
-with engine.connect() as connection:
-    # Users table
-    connection.execute(text("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL
-        )
-    """))
-    # Movies table with foreign key user_id
-    connection.execute(text("""
-        CREATE TABLE IF NOT EXISTS movies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            year INTEGER NOT NULL,
-            rating REAL NOT NULL,
-            poster_url TEXT,
-            user_id INTEGER,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            UNIQUE(title, user_id) -- same movie title allowed for different users
-        )
-    """))
-    connection.commit()
+import atexit
+import os
+import random
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import bindparam, create_engine, event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import QueuePool
+
+import metrics
+from storage import schema
+from storage.columns import MovieColumns
+from storage.writer import WriteQueue
+
+# SQLite DB file will be created inside data/ folder.
+# Override with the MOVIES_DB_URL environment variable or configure().
+DB_URL = os.environ.get("MOVIES_DB_URL", "sqlite:///data/movies.db")
+
+# echo=True prints all SQL — set MOVIES_DB_ECHO=1 while developing
+ECHO = os.environ.get("MOVIES_DB_ECHO", "") not in ("", "0")
+
+# Extra keyword arguments for create_engine (pool settings etc.)
+ENGINE_OPTIONS = {}
+
+# SQLite performance profile, applied to every new connection.
+# WAL lets readers run while one writer commits, and with synchronous=NORMAL
+# a commit no longer waits for an fsync of the main database file.
+PERFORMANCE_PROFILE = os.environ.get("MOVIES_DB_PROFILE", "1") != "0"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -32000,           # negative = KiB, so ~32 MB of page cache
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,           # ms to wait on a locked database
+}
+
+# Connections are kept open and reused: opening a SQLite connection and
+# warming its page cache costs more than most of our queries.
+SQLITE_POOL_OPTIONS = {
+    "poolclass": QueuePool,
+    "pool_size": 5,
+    "max_overflow": 10,
+}
+
+# The engine is created, and the schema migrated, on first use — importing
+# this module does not touch the database.
+_engine = None
+_engine_lock = threading.Lock()
+FTS_AVAILABLE = True
+
+# Mutations go through one writer thread that commits queued writes in
+# groups (see storage/writer.py). Set MOVIES_WRITE_QUEUE=0 to have every
+# call commit on its own connection instead. In-memory databases always
+# write directly: each pooled connection would see a different database.
+WRITE_QUEUE_ENABLED = os.environ.get("MOVIES_WRITE_QUEUE", "1") != "0"
+WRITE_QUEUE_OPTIONS = {"commit_interval": 0.0, "max_batch": 256, "lock_timeout": 30.0}
+_writer = None
+
+
+def configure(db_url=None, echo=None, profile=None, **engine_options):
+    """
+    Change the database settings before (or between) uses.
+    Any existing engine is disposed; the next call creates a new one.
+    """
+    global DB_URL, ECHO, PERFORMANCE_PROFILE, ENGINE_OPTIONS, _engine
+    close_writer()
+    with _engine_lock:
+        if db_url is not None:
+            DB_URL = db_url
+        if echo is not None:
+            ECHO = echo
+        if profile is not None:
+            PERFORMANCE_PROFILE = profile
+        ENGINE_OPTIONS = dict(engine_options)
+        clear_collection_cache()
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """connect event: apply SQLITE_PRAGMAS to a fresh DBAPI connection."""
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def _count_query(connection, cursor, statement, parameters, context, executemany):
+    """before_cursor_execute event: charge the statement to the running operation."""
+    metrics.record_query()
+
+
+def _create_engine():
+    """Build an engine from the current settings."""
+    options = dict(ENGINE_OPTIONS)
+    url_is_sqlite = DB_URL.startswith("sqlite")
+    in_memory = DB_URL in ("sqlite://", "sqlite:///:memory:")
+    if url_is_sqlite and not in_memory and "poolclass" not in options:
+        options.update(SQLITE_POOL_OPTIONS)
+
+    new_engine = create_engine(DB_URL, echo=ECHO, **options)
+    event.listen(new_engine, "before_cursor_execute", _count_query)
+    if url_is_sqlite and PERFORMANCE_PROFILE:
+        event.listen(new_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+
+def get_engine():
+    """Return the shared engine, creating it and migrating the schema on first use."""
+    global _engine, FTS_AVAILABLE
+    if _engine is not None:
+        return _engine
+    with _engine_lock:
+        if _engine is None:
+            new_engine = _create_engine()
+            database = new_engine.url.database
+            if new_engine.url.get_backend_name() == "sqlite" and database and database != ":memory:":
+                folder = os.path.dirname(database)
+                if folder:
+                    os.makedirs(folder, exist_ok=True)
+            with new_engine.connect() as connection:
+                schema.migrate(connection)
+                FTS_AVAILABLE = connection.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'catalog_fts'"
+                )).fetchone() is not None
+            _engine = new_engine
+    return _engine
+
+
+def get_writer():
+    """Return the shared WriteQueue for the current engine, starting it on first use."""
+    global _writer
+    engine = get_engine()
+    with _engine_lock:
+        if _writer is None or _writer.engine is not engine:
+            _writer = WriteQueue(engine, on_begin=_own_write_began,
+                                 on_commit=_own_write_committed, **WRITE_QUEUE_OPTIONS)
+        return _writer
+
+
+def close_writer():
+    """Commit whatever is still queued and stop the writer thread."""
+    global _writer
+    with _engine_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+
+atexit.register(close_writer)
+
+
+def _write(operation):
+    """
+    Run operation(connection) in a committed transaction and return its
+    result; its exception, if it fails, is raised here. The operation must
+    not commit, and must not call back into _write.
+    """
+    engine = get_engine()
+    if WRITE_QUEUE_ENABLED and engine.url.database not in (None, "", ":memory:"):
+        return get_writer().submit(operation).result()
+    with engine.connect() as connection:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        state = _own_write_began(connection)
+        result = operation(connection)
+        connection.commit()
+        _own_write_committed(connection, state)
+        return result
+
+
+# ---------- COLLECTION CACHE ----------
+#
+# list_movies() results are cached per user_id, most recently used last.
+# Our own writes invalidate the user's entry; writes by other processes are
+# noticed through PRAGMA data_version, which changes whenever another
+# connection commits to the database file, and then the whole cache is
+# dropped. Bounded by the total number of cached movies across users.
+#
+# The watch connection's data_version also moves on this process's own
+# commits, so _write brackets each of them (see _own_write_began) and records
+# the version they leave behind as already seen; while nothing is cached
+# there is nothing to keep, and writes skip that.
+#
+# Off by default (MOVIES_COLLECTION_CACHE=1 turns it on): the menu pages
+# and site builds stream from the database and never call list_movies(),
+# so only scripts that re-read whole collections benefit.
+
+COLLECTION_CACHE_ENABLED = os.environ.get("MOVIES_COLLECTION_CACHE", "0") not in ("", "0")
+COLLECTION_CACHE_MAX_MOVIES = 100_000
+
+_collection_cache = OrderedDict()   # user_id -> {title: {...}}
+_collection_cache_size = 0          # movies currently cached
+_collection_lock = threading.RLock()
+_collection_generation = 0          # bumped on every invalidation
+_collection_stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+_watch_connection = None            # dedicated connection for data_version
+_seen_data_version = None
+
+
+def _data_version():
+    """Current PRAGMA data_version as seen by the watch connection (SQLite only)."""
+    global _watch_connection
+    if not DB_URL.startswith("sqlite"):
+        return None
+    if _watch_connection is None:
+        _watch_connection = get_engine().connect()
+    version = _watch_connection.execute(text("PRAGMA data_version")).scalar()
+    _watch_connection.rollback()
+    return version
+
+
+def _drop_collection_cache():
+    """Empty the cache; caller holds _collection_lock."""
+    global _collection_cache_size, _collection_generation
+    _collection_cache.clear()
+    _collection_cache_size = 0
+    _collection_generation += 1
+
+
+def _check_data_version():
+    """Drop the cache if another connection committed since the last check."""
+    global _seen_data_version
+    version = _data_version()
+    if version != _seen_data_version:
+        if _seen_data_version is not None and _collection_cache:
+            _collection_stats["invalidations"] += 1
+        _drop_collection_cache()
+        _seen_data_version = version
+    return version
+
+
+def _own_write_began(connection):
+    """
+    Runs inside our write transaction, holding the write lock: take in any
+    commit by others first, then remember the writing connection's own
+    data_version, which our commit will not move.
+    """
+    if not COLLECTION_CACHE_ENABLED or not _collection_cache or not DB_URL.startswith("sqlite"):
+        return None
+    with _collection_lock:
+        _check_data_version()
+    return connection.exec_driver_sql("PRAGMA data_version").scalar()
+
+
+def _own_write_committed(connection, version_before):
+    """
+    After our commit: if the writing connection saw no other commit since
+    _own_write_began, the watch connection's new data_version is ours alone.
+    The watch is read first, so a commit by others landing in between shows
+    up in the second read and is left for _check_data_version.
+    """
+    global _seen_data_version
+    if version_before is None:
+        return
+    with _collection_lock:
+        version = _data_version()
+        if connection.exec_driver_sql("PRAGMA data_version").scalar() == version_before:
+            _seen_data_version = version
+
+
+def invalidate_collection(user_id):
+    """Forget the cached collection of one user (called after every write)."""
+    global _collection_cache_size, _collection_generation
+    with _collection_lock:
+        _collection_generation += 1
+        movies = _collection_cache.pop(user_id, None)
+        if movies is not None:
+            _collection_cache_size -= len(movies)
+            _collection_stats["invalidations"] += 1
+
+
+def clear_collection_cache():
+    """Forget every cached collection and close the watch connection."""
+    global _watch_connection, _seen_data_version
+    with _collection_lock:
+        _drop_collection_cache()
+        if _watch_connection is not None:
+            _watch_connection.close()
+            _watch_connection = None
+        _seen_data_version = None
+
+
+def collection_cache_stats():
+    """Hit/miss/invalidation/eviction counters plus current size."""
+    with _collection_lock:
+        return dict(_collection_stats, users=len(_collection_cache),
+                    movies=_collection_cache_size)
+
+
+def _cached_collection(user_id, load):
+    """Read-through lookup: return the cached collection or load and store it."""
+    global _collection_cache_size
+    with _collection_lock:
+        version = _check_data_version()
+        movies = _collection_cache.get(user_id)
+        if movies is not None:
+            _collection_cache.move_to_end(user_id)
+            _collection_stats["hits"] += 1
+            return movies
+        _collection_stats["misses"] += 1
+        generation = _collection_generation
+
+    movies = load(user_id)
+
+    with _collection_lock:
+        # Don't store what may already be stale
+        if generation != _collection_generation or _data_version() != version:
+            return movies
+        if len(movies) > COLLECTION_CACHE_MAX_MOVIES:
+            return movies
+        _collection_cache[user_id] = movies
+        _collection_cache_size += len(movies)
+        while _collection_cache_size > COLLECTION_CACHE_MAX_MOVIES:
+            _, evicted = _collection_cache.popitem(last=False)
+            _collection_cache_size -= len(evicted)
+            _collection_stats["evictions"] += 1
+    return movies
 
 
 # ---------- USER FUNCTIONS ----------
 
+@metrics.instrument("storage")
 def get_all_users():
     """Return list of all users as dicts: [{'id': 1, 'name': 'John'}, ...]."""
-    with engine.connect() as connection:
+    with get_engine().connect() as connection:
         result = connection.execute(text("SELECT id, name FROM users ORDER BY name"))
         return [{"id": row[0], "name": row[1]} for row in result.fetchall()]
 
 
+@metrics.instrument("storage", count_rows=False)
 def add_user(name):
     """Insert a new user. Returns the new user dict, or None if exists."""
-    with engine.connect() as connection:
-        try:
-            connection.execute(
-                text("INSERT INTO users (name) VALUES (:name)"),
-                {"name": name},
-            )
-            connection.commit()
-        except Exception as e:
-            print(f"Error adding user: {e}")
-            return None
+    try:
+        _write(lambda connection: connection.execute(
+            text("INSERT INTO users (name) VALUES (:name)"),
+            {"name": name},
+        ))
+    except SQLAlchemyError as e:
+        print(f"Error adding user: {e}")
+        return None
 
+    with get_engine().connect() as connection:
         result = connection.execute(
             text("SELECT id, name FROM users WHERE name = :name"),
             {"name": name},
@@ -61,57 +351,491 @@ def add_user(name):
         return {"id": result[0], "name": result[1]} if result else None
 
 
+@metrics.instrument("storage")
+def get_collection_version(user_id):
+    """Return the user's change counter; it moves on every add/update/delete."""
+    with get_engine().connect() as connection:
+        return connection.execute(
+            text("SELECT collection_version FROM users WHERE id = :user_id"),
+            {"user_id": user_id},
+        ).scalar()
+
+
 # ---------- MOVIE FUNCTIONS ----------
 
+@metrics.instrument("storage")
+def list_movies_page(user_id, page_size=20, after=None, before=None):
+    """
+    Return one page of a user's movies in (title NOCASE, id) order.
+    Keyset pagination: pass the (title, id) of the last row shown as `after`
+    for the next page, or of the first row shown as `before` for the previous
+    one, so page N never skips over the rows before it.
+    Rows are dicts with id, title, year, rating and poster_url.
+    """
+    params = {"user_id": user_id, "limit": page_size}
+    condition = ""
+    descending = ""
+    if after is not None:
+        # The second term only breaks ties between equal titles
+        condition = """
+            AND title >= :key_title COLLATE NOCASE
+            AND (title > :key_title COLLATE NOCASE OR id > :key_id)
+        """
+        params["key_title"], params["key_id"] = after
+    elif before is not None:
+        condition = """
+            AND title <= :key_title COLLATE NOCASE
+            AND (title < :key_title COLLATE NOCASE OR id < :key_id)
+        """
+        params["key_title"], params["key_id"] = before
+        descending = " DESC"
+
+    with get_engine().connect() as connection:
+        rows = connection.execute(text(f"""
+            SELECT id, title, year, rating, poster_url
+            FROM movies
+            WHERE user_id = :user_id {condition}
+            ORDER BY title COLLATE NOCASE{descending}, id{descending}
+            LIMIT :limit
+        """), params).fetchall()
+    if before is not None:
+        rows.reverse()
+    return [
+        {"id": row[0], "title": row[1], "year": row[2], "rating": row[3], "poster_url": row[4]}
+        for row in rows
+    ]
+
+
+def iter_movies(user_id, chunk_size=500):
+    """
+    Yield a user's movies (list_movies_page rows) in title order. One query,
+    read chunk_size rows at a time, so memory use doesn't grow with the
+    collection and the rows are walked through the title index only once.
+    """
+    with get_engine().connect() as connection:
+        result = connection.execute(text("""
+            SELECT id, title, year, rating, poster_url
+            FROM movies
+            WHERE user_id = :user_id
+            ORDER BY title COLLATE NOCASE, id
+        """), {"user_id": user_id})
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                return
+            for row in rows:
+                yield {"id": row[0], "title": row[1], "year": row[2], "rating": row[3],
+                       "poster_url": row[4]}
+
+
+def _load_collection(user_id):
+    return {
+        movie["title"]: {"year": movie["year"], "rating": movie["rating"],
+                         "poster_url": movie["poster_url"]}
+        for movie in iter_movies(user_id)
+    }
+
+
+@metrics.instrument("storage")
 def list_movies(user_id):
-    """Return movies for a specific user_id as {title: {...}}."""
-    with engine.connect() as connection:
+    """
+    Return movies for a specific user_id as {title: {...}}.
+    Served from the collection cache when enabled; treat the result as read-only.
+    """
+    if not COLLECTION_CACHE_ENABLED:
+        return _load_collection(user_id)
+    return _cached_collection(user_id, _load_collection)
+
+
+@metrics.instrument("storage", count_rows=False)
+def load_movie_columns(user_id, chunk_size=5000):
+    """
+    Return a user's movies as a MovieColumns (storage/columns.py) in title
+    order: typed arrays instead of a dict per movie, for in-process analytics.
+    """
+    columns = MovieColumns()
+    with get_engine().connect() as connection:
         result = connection.execute(text("""
-            SELECT title, year, rating, poster_url
+            SELECT id, title, year, rating, poster_url
             FROM movies
             WHERE user_id = :user_id
-            ORDER BY title COLLATE NOCASE
+            ORDER BY title COLLATE NOCASE, id
         """), {"user_id": user_id})
-        rows = result.fetchall()
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                break
+            columns.extend(rows)
+    return columns
+
+
+# Sort keys accepted by query_movies -> ORDER BY expression
+SORT_COLUMNS = {
+    "title": "title COLLATE NOCASE",
+    "rating": "rating",
+    "year": "year",
+}
+
+
+def _build_movie_query(user_id, sort_by="title", descending=False,
+                       min_rating=None, start_year=None, end_year=None, limit=None):
+    """Returns (sql, params) for query_movies / explain_movie_query."""
+    if sort_by not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort key: {sort_by!r}")
+
+    conditions = ["user_id = :user_id"]
+    params = {"user_id": user_id}
+    if min_rating is not None:
+        conditions.append("rating >= :min_rating")
+        params["min_rating"] = min_rating
+    if start_year is not None:
+        conditions.append("year >= :start_year")
+        params["start_year"] = start_year
+    if end_year is not None:
+        conditions.append("year <= :end_year")
+        params["end_year"] = end_year
+
+    order_by = SORT_COLUMNS[sort_by] + (" DESC" if descending else "")
+    if sort_by != "title":
+        order_by += ", title COLLATE NOCASE"   # ties stay in alphabetical order
+
+    sql = f"""
+        SELECT title, year, rating, poster_url
+        FROM movies
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {order_by}
+    """
+    if limit is not None:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+    return sql, params
+
+
+@metrics.instrument("storage")
+def query_movies(user_id, sort_by="title", descending=False,
+                 min_rating=None, start_year=None, end_year=None, limit=None):
+    """
+    Return a user's movies as {title: {...}}, sorted and filtered in SQL.
+    sort_by is one of SORT_COLUMNS; the other arguments are optional filters.
+    """
+    sql, params = _build_movie_query(user_id, sort_by, descending,
+                                     min_rating, start_year, end_year, limit)
+    with get_engine().connect() as connection:
+        rows = connection.execute(text(sql), params).fetchall()
+    return {
+        row[0]: {"year": row[1], "rating": row[2], "poster_url": row[3]}
+        for row in rows
+    }
+
+
+def explain_movie_query(user_id, **query_args):
+    """Return the EXPLAIN QUERY PLAN detail lines for a query_movies call."""
+    sql, params = _build_movie_query(user_id, **query_args)
+    with get_engine().connect() as connection:
+        rows = connection.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def _fts_query(query):
+    """Turns free text into an FTS5 query: every word must match as a prefix."""
+    words = query.replace('"', " ").split()
+    return " ".join(f'"{word}"*' for word in words)
+
+
+@metrics.instrument("storage")
+def search_movies(user_id, query, limit=100):
+    """
+    Full-text search in a user's titles, best matches first (bm25).
+    Each word of the query matches as a token prefix, e.g. "dark kn" finds
+    "The Dark Knight". Returns {title: {...}} like list_movies.
+    """
+    match = _fts_query(query)
+    if not match:
+        return {}
+
+    if FTS_AVAILABLE:
+        sql = """
+            SELECT m.title, m.year, m.rating, m.poster_url
+            FROM catalog_fts
+            JOIN movies AS m ON m.catalog_id = catalog_fts.rowid
+            WHERE catalog_fts MATCH :match AND m.user_id = :user_id
+            ORDER BY bm25(catalog_fts), m.title COLLATE NOCASE
+            LIMIT :limit
+        """
+        params = {"match": match, "user_id": user_id, "limit": limit}
+    else:
+        sql = """
+            SELECT title, year, rating, poster_url
+            FROM movies
+            WHERE user_id = :user_id AND title LIKE :pattern
+            ORDER BY title COLLATE NOCASE
+            LIMIT :limit
+        """
+        params = {"pattern": f"%{query.strip()}%", "user_id": user_id, "limit": limit}
+
+    with get_engine().connect() as connection:
+        rows = connection.execute(text(sql), params).fetchall()
     return {
         row[0]: {"year": row[1], "rating": row[2], "poster_url": row[3]}
         for row in rows
     }
 
 
+@metrics.instrument("storage")
+def count_movies(user_id):
+    """Return how many movies a user has."""
+    with get_engine().connect() as connection:
+        return connection.execute(
+            text("SELECT COUNT(*) FROM user_movies WHERE user_id = :user_id"),
+            {"user_id": user_id},
+        ).scalar()
+
+
+@metrics.instrument("storage", count_rows=False)
+def random_movie(user_id):
+    """
+    Return one uniformly random movie of a user as a get_movie() dict, or None.
+    Picks a random position and fetches only that row instead of loading
+    the collection.
+    """
+    with get_engine().connect() as connection:
+        count = connection.execute(
+            text("SELECT COUNT(*) FROM user_movies WHERE user_id = :user_id"),
+            {"user_id": user_id},
+        ).scalar()
+        if count == 0:
+            return None
+        row = connection.execute(text("""
+            SELECT title, year, rating, poster_url
+            FROM movies
+            WHERE id = (
+                SELECT id FROM movies
+                WHERE user_id = :user_id
+                ORDER BY title COLLATE NOCASE
+                LIMIT 1 OFFSET :offset
+            )
+        """), {"user_id": user_id, "offset": random.randrange(count)}).fetchone()
+    return {"title": row[0], "year": row[1], "rating": row[2], "poster_url": row[3]}
+
+
+@metrics.instrument("storage")
+def sample_movies(user_id, k):
+    """
+    Return up to k distinct random movies of a user as {title: {...}}.
+    All k positions are resolved in a single query.
+    """
+    with get_engine().connect() as connection:
+        count = connection.execute(
+            text("SELECT COUNT(*) FROM user_movies WHERE user_id = :user_id"),
+            {"user_id": user_id},
+        ).scalar()
+        if count == 0 or k <= 0:
+            return {}
+        positions = random.sample(range(1, count + 1), min(k, count))
+        statement = text("""
+            SELECT title, year, rating, poster_url
+            FROM movies
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (ORDER BY title COLLATE NOCASE) AS position
+                    FROM movies
+                    WHERE user_id = :user_id
+                )
+                WHERE position IN :positions
+            )
+        """).bindparams(bindparam("positions", expanding=True))
+        rows = connection.execute(
+            statement, {"user_id": user_id, "positions": positions}
+        ).fetchall()
+    random.shuffle(rows)
+    return {
+        row[0]: {"year": row[1], "rating": row[2], "poster_url": row[3]}
+        for row in rows
+    }
+
+
+@metrics.instrument("storage", count_rows=False)
+def get_statistics(user_id):
+    """
+    Compute rating statistics for a user inside SQLite.
+    Returns None if the user has no movies, otherwise a dict with
+    count, average, median, min, max, best_titles and worst_titles.
+    """
+    with get_engine().connect() as connection:
+        summary = connection.execute(text("""
+            SELECT COUNT(*), AVG(rating), MIN(rating), MAX(rating)
+            FROM movies
+            WHERE user_id = :user_id
+        """), {"user_id": user_id}).fetchone()
+        count, average, lowest, highest = summary
+        if count == 0:
+            return None
+
+        # Median: average of the one or two middle rows in rating order
+        median = connection.execute(text("""
+            SELECT AVG(rating) FROM (
+                SELECT rating, ROW_NUMBER() OVER (ORDER BY rating) AS position
+                FROM movies
+                WHERE user_id = :user_id
+            )
+            WHERE position IN ((:count + 1) / 2, (:count + 2) / 2)
+        """), {"user_id": user_id, "count": count}).scalar()
+
+        extremes = connection.execute(text("""
+            SELECT title, rating
+            FROM movies
+            WHERE user_id = :user_id AND rating IN (:lowest, :highest)
+            ORDER BY title COLLATE NOCASE
+        """), {"user_id": user_id, "lowest": lowest, "highest": highest}).fetchall()
+
+    return {
+        "count": count,
+        "average": average,
+        "median": median,
+        "min": lowest,
+        "max": highest,
+        "best_titles": [row[0] for row in extremes if row[1] == highest],
+        "worst_titles": [row[0] for row in extremes if row[1] == lowest],
+    }
+
+
+@metrics.instrument("storage", count_rows=False)
+def get_user_stats(user_id):
+    """
+    get_statistics() from the trigger-maintained user_stats table: a few
+    index lookups whatever the collection size. The median comes from
+    0.1-wide rating bins; best / worst list every title tied at the max /
+    min rating, found through the (user_id, rating) index.
+    """
+    with get_engine().connect() as connection:
+        row = connection.execute(text("""
+            SELECT movie_count, rating_sum, min_rating, max_rating
+            FROM user_stats WHERE user_id = :user_id
+        """), {"user_id": user_id}).fetchone()
+        if row is None or row[0] == 0:
+            return None
+        bins = connection.execute(text("""
+            SELECT bin, movies FROM user_rating_bins
+            WHERE user_id = :user_id AND movies > 0 ORDER BY bin
+        """), {"user_id": user_id}).fetchall()
+        # No ORDER BY: sorting in SQL would walk the title index instead
+        extremes = connection.execute(text("""
+            SELECT title, rating FROM movies
+            WHERE user_id = :user_id AND rating IN (:lowest, :highest)
+        """), {"user_id": user_id, "lowest": row[2], "highest": row[3]}).fetchall()
+    extremes.sort(key=lambda extreme: extreme[0].translate(_NOCASE))
+
+    count = row[0]
+    middle = []
+    seen = 0
+    for rating_bin, movies in bins:
+        seen += movies
+        while len(middle) < 2 and seen >= ((count + 1) // 2, (count + 2) // 2)[len(middle)]:
+            middle.append(rating_bin / 10)
+    return {
+        "count": count,
+        "average": row[1] / count,
+        "median": sum(middle) / 2,
+        "min": row[2],
+        "max": row[3],
+        "best_titles": [title for title, rating in extremes if rating == row[3]],
+        "worst_titles": [title for title, rating in extremes if rating == row[2]],
+    }
+
+
+# A user's row for a title (any case): of that year if one is given, the
+# exact spelling first. Collections from before the catalog may hold case
+# variants side by side, e.g. "Alien" (1979) and "alien" (1986). Left to
+# itself the planner walks the covering (user_id, year, title) index over
+# the whole collection instead of seeking the title.
+_OWNED_ROW_ID = """
+    SELECT id FROM user_movies INDEXED BY idx_movies_user_title_nocase
+    WHERE user_id = :user_id AND title = :title COLLATE NOCASE
+      AND (:year IS NULL OR year = :year)
+    ORDER BY title = :title DESC, id
+    LIMIT 1
+"""
+
+
+@metrics.instrument("storage", count_rows=False)
+def get_movie(user_id, title, year=None):
+    """Return {"title", "year", "rating", "poster_url"} for a title (any case), or None."""
+    with get_engine().connect() as connection:
+        row = connection.execute(text(f"""
+            SELECT title, year, rating, poster_url
+            FROM movies
+            WHERE id = ({_OWNED_ROW_ID})
+        """), {"user_id": user_id, "title": title, "year": year}).fetchone()
+    if row is None:
+        return None
+    return {"title": row[0], "year": row[1], "rating": row[2], "poster_url": row[3]}
+
+
+# Writes go to the catalog / user_movies tables behind the movies view
+# (see schema._create_catalog). A movie is added by making sure its catalog
+# entry exists, then linking it to the user; the link keeps the user's
+# spelling of the title, and the given rating and poster only where they
+# differ from the catalog's, plus the year and effective rating the per-user
+# indexes sort by (schema._add_sort_keys). Deleting a catalog entry's last
+# link deletes the entry (schema._keep_owner_data).
+
+_ADD_TO_CATALOG = text("""
+    INSERT INTO catalog (title, year, rating, poster_url)
+    VALUES (:title, :year, :rating, :poster_url)
+    ON CONFLICT (title COLLATE NOCASE, year) DO NOTHING
+""")
+
+# Skips titles the user already owns in any case or year
+_LINK_TO_USER = text("""
+    INSERT OR IGNORE INTO user_movies
+        (user_id, catalog_id, rating, title, poster_url, year, effective_rating)
+    SELECT :user_id, c.id, NULLIF(:rating, c.rating), :title, NULLIF(:poster_url, c.poster_url),
+           c.year, :rating
+    FROM catalog AS c
+    WHERE c.title = :title COLLATE NOCASE AND c.year = :year
+      AND NOT EXISTS (
+          SELECT 1 FROM user_movies
+          WHERE user_id = :user_id AND title = :title COLLATE NOCASE
+      )
+""")
+
+
+@metrics.instrument("storage")
 def add_movie(user_id, title, year, rating, poster_url=None):
     """Insert a new movie for a user. Returns True on success, False on error."""
-    with engine.connect() as connection:
-        try:
-            connection.execute(
-                text("""
-                    INSERT INTO movies (title, year, rating, poster_url, user_id)
-                    VALUES (:title, :year, :rating, :poster_url, :user_id)
-                """),
-                {"title": title, "year": year, "rating": rating,
-                 "poster_url": poster_url, "user_id": user_id},
-            )
-            connection.commit()
-            print(f"Movie '{title}' added successfully for user {user_id}.")
-            return True
-        except Exception as e:
-            print(f"Error: {e}")
-            return False
+    row = {"title": title, "year": year, "rating": rating,
+           "poster_url": poster_url, "user_id": user_id}
 
+    def insert(connection):
+        connection.execute(_ADD_TO_CATALOG, row)
+        return connection.execute(_LINK_TO_USER, row).rowcount
 
-def delete_movie(user_id, title):
-    """Delete by title for a specific user. Returns True if something was deleted."""
-    with engine.connect() as connection:
-        result = connection.execute(
-            text("""
-                DELETE FROM movies
-                WHERE lower(title) = lower(:title) AND user_id = :user_id
-            """),
-            {"title": title, "user_id": user_id},
-        )
-        connection.commit()
+    try:
+        inserted = _write(insert)
+    except SQLAlchemyError as e:
+        print(f"Error: {e}")
+        return False
+    if inserted == 0:
+        print(f"Error: '{title}' is already in the collection of user {user_id}.")
+        return False
+    invalidate_collection(user_id)
+    print(f"Movie '{title}' added successfully for user {user_id}.")
+    return True
+
+
+@metrics.instrument("storage")
+def delete_movie(user_id, title, year=None):
+    """
+    Delete a title (any case; of that year if given) for a specific user.
+    Returns True if something was deleted.
+    """
+    deleted = _write(lambda connection: connection.execute(
+        text(f"DELETE FROM user_movies WHERE id = ({_OWNED_ROW_ID})"),
+        {"title": title, "year": year, "user_id": user_id},
+    ).rowcount)
+    invalidate_collection(user_id)
 
-    if result.rowcount > 0:
+    if deleted > 0:
         print(f"Movie '{title}' deleted successfully for user {user_id}.")
         return True
     else:
@@ -119,22 +843,422 @@ def delete_movie(user_id, title):
         return False
 
 
-def update_movie(user_id, title, rating):
-    """Update rating by title for a specific user. Returns True if updated."""
-    with engine.connect() as connection:
-        result = connection.execute(
-            text("""
-                UPDATE movies
-                SET rating = :rating
-                WHERE lower(title) = lower(:title) AND user_id = :user_id
-            """),
-            {"title": title, "rating": rating, "user_id": user_id},
-        )
-        connection.commit()
+@metrics.instrument("storage")
+def update_movie(user_id, title, rating, year=None):
+    """
+    Set the user's own rating for a title (of that year if given).
+    Returns True if updated. The override sticks: later catalog rating
+    refreshes don't replace it.
+    """
+    updated = _write(lambda connection: connection.execute(
+        text(f"""
+            UPDATE user_movies
+            SET rating = :rating, effective_rating = :rating
+            WHERE id = ({_OWNED_ROW_ID})
+        """),
+        {"title": title, "year": year, "rating": rating, "user_id": user_id},
+    ).rowcount)
+    invalidate_collection(user_id)
 
-    if result.rowcount > 0:
+    if updated > 0:
         print(f"Movie '{title}' updated successfully for user {user_id}.")
         return True
     else:
         print(f"Movie '{title}' not found for this user.")
         return False
+
+
+# ---------- BATCH WRITES ----------
+#
+# Batch counterparts of add_movie / update_movie / delete_movie. Each call
+# runs in a single transaction, sending rows to executemany in chunks of
+# batch_size, and returns one (title, outcome) pair per input row in input
+# order instead of printing. Titles match case-insensitively, as everywhere.
+# The transaction holds the write lock, and the writer thread, from the
+# first chunk on, so pass slow iterables (e.g. network lookups) in pieces
+# rather than as one stream.
+# The user's stats are rebuilt once per call rather than kept per row.
+
+INSERTED = "inserted"
+UPDATED = "updated"
+DELETED = "deleted"
+DUPLICATE = "duplicate"      # the user already owns the title (or it repeats in the batch)
+NOT_FOUND = "not found"
+INVALID = "invalid"          # missing year or rating
+
+# SQLite's NOCASE folds ASCII letters only; match it exactly
+_NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def _owned_titles(connection, user_id, titles):
+    """The NOCASE keys of those `titles` the user owns."""
+    statement = text("""
+        SELECT title FROM user_movies
+        WHERE user_id = :user_id AND title COLLATE NOCASE IN :titles
+    """).bindparams(bindparam("titles", expanding=True))
+    rows = connection.execute(statement, {"user_id": user_id, "titles": list(titles)})
+    return {row[0].translate(_NOCASE) for row in rows}
+
+
+def _defer_stats(connection, user_id):
+    """Pause the per-row user_stats triggers for this user until _resume_stats."""
+    connection.execute(text("INSERT OR IGNORE INTO stats_deferred (user_id) VALUES (:user_id)"),
+                       {"user_id": user_id})
+
+
+def _resume_stats(connection, user_id):
+    """Recompute the user's stats once and switch the triggers back on."""
+    connection.execute(text("DELETE FROM stats_deferred WHERE user_id = :user_id"),
+                       {"user_id": user_id})
+    schema.rebuild_user_stats(connection, [user_id])
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+@metrics.instrument("storage")
+def add_movies(user_id, movies, batch_size=500, upsert=False):
+    """
+    Insert many movies for a user in one transaction.
+    `movies` is an iterable of (title, year, rating, poster_url) tuples.
+    Titles the user already owns are DUPLICATE, or with upsert=True get the
+    given rating as the user's own (UPDATED). Returns [(title, outcome), ...].
+    """
+    movies = list(movies)
+    set_rating = text(f"""
+        UPDATE user_movies
+        SET rating = NULLIF(:rating, (SELECT rating FROM catalog WHERE id = user_movies.catalog_id)),
+            effective_rating = :rating
+        WHERE id = ({_OWNED_ROW_ID})
+    """)
+
+    def write(connection):
+        outcomes = []
+        seen = set()
+        _defer_stats(connection, user_id)
+        for chunk in _chunks(movies, batch_size):
+            owned = _owned_titles(connection, user_id, {row[0] for row in chunk})
+            new_rows, existing_rows = [], []
+            for title, year, rating, poster_url in chunk:
+                key = title.translate(_NOCASE)
+                row = {"title": title, "year": year, "rating": rating,
+                       "poster_url": poster_url, "user_id": user_id}
+                if year is None or rating is None:
+                    outcomes.append((title, INVALID))
+                elif key in owned or key in seen:
+                    existing_rows.append(dict(row, year=None))   # whichever year they own
+                    outcomes.append((title, UPDATED if upsert else DUPLICATE))
+                else:
+                    seen.add(key)
+                    new_rows.append(row)
+                    outcomes.append((title, INSERTED))
+            if new_rows:
+                connection.execute(_ADD_TO_CATALOG, new_rows)
+                connection.execute(_LINK_TO_USER, new_rows)
+            if upsert and existing_rows:
+                connection.execute(set_rating, existing_rows)
+        _resume_stats(connection, user_id)
+        return outcomes
+
+    outcomes = _write(write)
+    invalidate_collection(user_id)
+    return outcomes
+
+
+@metrics.instrument("storage")
+def update_movies(user_id, updates, batch_size=500):
+    """
+    Set the user's own rating for many titles in one transaction.
+    `updates` is an iterable of (title, rating). Returns [(title, UPDATED or NOT_FOUND), ...].
+    """
+    updates = list(updates)
+    statement = text(f"""
+        UPDATE user_movies SET rating = :rating, effective_rating = :rating
+        WHERE id = ({_OWNED_ROW_ID})
+    """)
+
+    def write(connection):
+        outcomes = []
+        _defer_stats(connection, user_id)
+        for chunk in _chunks(updates, batch_size):
+            owned = _owned_titles(connection, user_id, {title for title, _ in chunk})
+            found = []
+            for title, rating in chunk:
+                if title.translate(_NOCASE) in owned:
+                    found.append({"title": title, "year": None, "rating": rating,
+                                  "user_id": user_id})
+                    outcomes.append((title, UPDATED))
+                else:
+                    outcomes.append((title, NOT_FOUND))
+            if found:
+                connection.execute(statement, found)
+        _resume_stats(connection, user_id)
+        return outcomes
+
+    outcomes = _write(write)
+    invalidate_collection(user_id)
+    return outcomes
+
+
+@metrics.instrument("storage")
+def delete_movies(user_id, titles, batch_size=500):
+    """
+    Delete many titles of a user in one transaction.
+    Returns [(title, DELETED or NOT_FOUND), ...]; a title repeated in the
+    input is NOT_FOUND the second time.
+    """
+    titles = list(titles)
+    statement = text(f"DELETE FROM user_movies WHERE id = ({_OWNED_ROW_ID})")
+
+    def write(connection):
+        outcomes = []
+        _defer_stats(connection, user_id)
+        for chunk in _chunks(titles, batch_size):
+            owned = _owned_titles(connection, user_id, set(chunk))
+            found = []
+            for title in chunk:
+                key = title.translate(_NOCASE)
+                if key in owned:
+                    owned.discard(key)
+                    found.append({"title": title, "year": None, "user_id": user_id})
+                    outcomes.append((title, DELETED))
+                else:
+                    outcomes.append((title, NOT_FOUND))
+            if found:
+                connection.execute(statement, found)
+        _resume_stats(connection, user_id)
+        return outcomes
+
+    outcomes = _write(write)
+    invalidate_collection(user_id)
+    return outcomes
+
+
+# ---------- LIBRARY-WIDE READS ----------
+
+def iter_library_chunks(chunk_size=50_000):
+    """
+    Yield every user's movies as lists of (user_id, catalog_id, year, rating)
+    tuples, at most chunk_size per list, so memory stays flat however big
+    the library is.
+    """
+    with get_engine().connect() as connection:
+        result = connection.execute(text(
+            "SELECT user_id, catalog_id, year, rating FROM movies"
+        ))
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+
+
+@metrics.instrument("storage")
+def get_catalog_entries(catalog_ids, chunk_size=500):
+    """Return {catalog_id: {"title", "year"}} for the given catalog ids."""
+    catalog_ids = list(catalog_ids)
+    statement = text("""
+        SELECT id, title, year FROM catalog WHERE id IN :ids
+    """).bindparams(bindparam("ids", expanding=True))
+    entries = {}
+    with get_engine().connect() as connection:
+        for start in range(0, len(catalog_ids), chunk_size):
+            for row in connection.execute(statement, {"ids": catalog_ids[start:start + chunk_size]}):
+                entries[row[0]] = {"title": row[1], "year": row[2]}
+    return entries
+
+
+# ---------- STATS MAINTENANCE ----------
+
+def verify_user_stats():
+    """
+    Compare user_stats / user_rating_bins with a fresh scan of the movies
+    view. Returns the ids of users whose stored stats have drifted.
+    """
+    with get_engine().connect() as connection:
+        rows = connection.execute(text("""
+            SELECT u.id
+            FROM users AS u
+            LEFT JOIN user_stats AS s ON s.user_id = u.id
+            LEFT JOIN (
+                SELECT user_id, COUNT(*) AS movie_count, SUM(rating) AS rating_sum,
+                       MIN(rating) AS min_rating, MAX(rating) AS max_rating
+                FROM movies GROUP BY user_id
+            ) AS a ON a.user_id = u.id
+            WHERE coalesce(s.movie_count, 0) != coalesce(a.movie_count, 0)
+               OR abs(coalesce(s.rating_sum, 0) - coalesce(a.rating_sum, 0)) > 1e-6
+               OR s.min_rating IS NOT a.min_rating
+               OR s.max_rating IS NOT a.max_rating
+               OR (SELECT rating FROM movies WHERE id = s.best_movie_id) IS NOT a.max_rating
+               OR (SELECT rating FROM movies WHERE id = s.worst_movie_id) IS NOT a.min_rating
+            UNION
+            SELECT user_id FROM (
+                SELECT user_id, bin, movies FROM user_rating_bins WHERE movies > 0
+                EXCEPT
+                SELECT user_id, CAST(round(rating * 10) AS INTEGER), COUNT(*) FROM movies GROUP BY 1, 2
+            )
+            UNION
+            SELECT user_id FROM (
+                SELECT user_id, CAST(round(rating * 10) AS INTEGER), COUNT(*) FROM movies GROUP BY 1, 2
+                EXCEPT
+                SELECT user_id, bin, movies FROM user_rating_bins WHERE movies > 0
+            )
+            ORDER BY 1
+        """)).fetchall()
+    return [row[0] for row in rows]
+
+
+def rebuild_user_stats(user_ids=None):
+    """Recompute the stored stats of the given users (default: everyone)."""
+    _write(lambda connection: schema.rebuild_user_stats(connection, user_ids))
+
+
+# ---------- WEBSITE BUILD STATE ----------
+
+@metrics.instrument("storage", count_rows=False)
+def get_site_build(user_id):
+    """Return the last recorded website build for a user as a dict, or None."""
+    with get_engine().connect() as connection:
+        row = connection.execute(text("""
+            SELECT collection_version, build_key, output_file
+            FROM site_builds WHERE user_id = :user_id
+        """), {"user_id": user_id}).fetchone()
+    if row is None:
+        return None
+    return {"collection_version": row[0], "build_key": row[1], "output_file": row[2]}
+
+
+@metrics.instrument("storage")
+def record_site_build(user_id, collection_version, build_key, output_file):
+    """Remember that the user's website was built from this collection version."""
+    _write(lambda connection: connection.execute(text("""
+        INSERT INTO site_builds (user_id, collection_version, build_key, output_file)
+        VALUES (:user_id, :collection_version, :build_key, :output_file)
+        ON CONFLICT (user_id) DO UPDATE SET
+            collection_version = excluded.collection_version,
+            build_key = excluded.build_key,
+            output_file = excluded.output_file
+    """), {"user_id": user_id, "collection_version": collection_version,
+           "build_key": build_key, "output_file": output_file}))
+
+
+@metrics.instrument("storage")
+def get_mirrored_posters(urls, chunk_size=500):
+    """Return {url: {"url", "path", "thumbnail_path", "fetched_at"}} for the URLs already mirrored."""
+    urls = list(urls)
+    statement = text("""
+        SELECT url, path, thumbnail_path, fetched_at FROM poster_mirror WHERE url IN :urls
+    """).bindparams(bindparam("urls", expanding=True))
+    mirrored = {}
+    with get_engine().connect() as connection:
+        for start in range(0, len(urls), chunk_size):
+            rows = connection.execute(statement, {"urls": urls[start:start + chunk_size]})
+            for row in rows:
+                mirrored[row[0]] = {"url": row[0], "path": row[1],
+                                    "thumbnail_path": row[2], "fetched_at": row[3]}
+    return mirrored
+
+
+@metrics.instrument("storage")
+def record_mirrored_posters(entries):
+    """Store [{"url", "path", "thumbnail_path", "fetched_at"}, ...] in one transaction."""
+    if not entries:
+        return
+    entries = list(entries)
+    _write(lambda connection: connection.execute(text("""
+        INSERT OR REPLACE INTO poster_mirror (url, path, thumbnail_path, fetched_at)
+        VALUES (:url, :path, :thumbnail_path, :fetched_at)
+    """), entries))
+
+
+# ---------- RATING REFRESH ----------
+
+@metrics.instrument("storage")
+def stale_titles(cutoff):
+    """
+    Return the distinct titles (case-insensitive) of the catalog entries
+    whose rating was refreshed before `cutoff` (ISO time) or never.
+    """
+    with get_engine().connect() as connection:
+        rows = connection.execute(text("""
+            SELECT MIN(title)
+            FROM catalog
+            WHERE rating_refreshed_at IS NULL OR rating_refreshed_at < :cutoff
+            GROUP BY title COLLATE NOCASE
+            ORDER BY title COLLATE NOCASE
+        """), {"cutoff": cutoff}).fetchall()
+    return [row[0] for row in rows]
+
+
+@metrics.instrument("storage", count_rows=False)
+def apply_rating_refresh(results, cutoff, refreshed_at):
+    """
+    Store refreshed ratings in the shared catalog, in one transaction: one
+    UPDATE per title via executemany. Every owner sees the new rating unless
+    they set their own. `results` holds (title, year, rating) as OMDb
+    answered; the rating goes only to the entry of that year, never to a
+    same-titled film of another year. rating None keeps the stored rating
+    (OMDb has no rating for that title). Every stale entry of the title is
+    marked refreshed either way: asking again by title gets the same answer.
+    Returns the number of catalog entries whose rating was refreshed.
+    """
+    params = [{"title": title, "year": year, "rating": rating, "cutoff": cutoff,
+               "refreshed_at": refreshed_at} for title, year, rating in results]
+    if not params:
+        return 0
+    stale = "(rating_refreshed_at IS NULL OR rating_refreshed_at < :cutoff)"
+
+    def refresh(connection):
+        updated = connection.execute(text(f"""
+            UPDATE catalog
+            SET rating = COALESCE(:rating, rating), rating_refreshed_at = :refreshed_at
+            WHERE title = :title COLLATE NOCASE AND year = :year AND {stale}
+        """), params).rowcount
+        connection.execute(text(f"""
+            UPDATE catalog SET rating_refreshed_at = :refreshed_at
+            WHERE title = :title COLLATE NOCASE AND {stale}
+        """), params)
+        return updated
+
+    updated = _write(refresh)
+    # Any number of users may have changed; drop every cached collection
+    with _collection_lock:
+        _drop_collection_cache()
+    return updated
+
+
+@metrics.instrument("storage", count_rows=False)
+def start_refresh_run(cutoff, started_at):
+    """Record a new refresh run and return its id."""
+    return _write(lambda connection: connection.execute(text("""
+        INSERT INTO refresh_runs (started_at, cutoff) VALUES (:started_at, :cutoff)
+    """), {"started_at": started_at, "cutoff": cutoff}).lastrowid)
+
+
+@metrics.instrument("storage", count_rows=False)
+def get_unfinished_refresh_run():
+    """Return the latest refresh run that never finished as a dict, or None."""
+    with get_engine().connect() as connection:
+        row = connection.execute(text("""
+            SELECT id, started_at, cutoff FROM refresh_runs
+            WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1
+        """)).fetchone()
+    if row is None:
+        return None
+    return {"id": row[0], "started_at": row[1], "cutoff": row[2]}
+
+
+@metrics.instrument("storage", count_rows=False)
+def finish_refresh_run(run_id, finished_at):
+    """Mark a refresh run as complete."""
+    _write(lambda connection: connection.execute(text("""
+        UPDATE refresh_runs SET finished_at = :finished_at WHERE id = :run_id
+    """), {"finished_at": finished_at, "run_id": run_id}))
@@ -0,0 +1,700 @@
+# storage/schema.py
+# Versioned schema migrations for the SQL storage.
+#
+# Each migration runs once per database; the applied versions are recorded
+# in the schema_migrations table. On a database that is already up to date
+# startup costs a single SELECT, no DDL.
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+def _create_base_tables(connection):
+    """Users and movies tables plus the sort / filter indexes."""
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        )
+    """))
+    # Movies table with foreign key user_id
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS movies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            rating REAL NOT NULL,
+            poster_url TEXT,
+            user_id INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            UNIQUE(title, user_id) -- same movie title allowed for different users
+        )
+    """))
+    # Composite indexes for the sorted / filtered menu queries
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_movies_user_rating ON movies (user_id, rating)"
+    ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_movies_user_year ON movies (user_id, year)"
+    ))
+
+
+def find_case_duplicates(connection):
+    """Return [(user_id, [titles...]), ...] for titles that differ only in case."""
+    rows = connection.execute(text("""
+        SELECT user_id, group_concat(title, char(31))
+        FROM movies
+        GROUP BY user_id, title COLLATE NOCASE
+        HAVING COUNT(*) > 1
+    """)).fetchall()
+    return [(row[0], row[1].split(chr(31))) for row in rows]
+
+
+def ensure_title_index(connection):
+    """
+    Case-insensitive title key: lookups by title seek through this index.
+    Older databases may hold case-only duplicates ("Alien" / "alien"); those
+    get a plain index; migration 7 merges them into one catalog entry.
+    """
+    existing = connection.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'idx_movies_user_title_nocase'"
+    )).fetchone()
+    if existing is not None and existing[0].upper().startswith("CREATE UNIQUE"):
+        return
+
+    duplicates = find_case_duplicates(connection)
+    unique = "" if duplicates else "UNIQUE"
+    if duplicates:
+        print("Warning: found titles that differ only in case; the title "
+              "index stays non-unique until they are removed:")
+        for dup_user_id, titles in duplicates:
+            print(f"  user {dup_user_id}: {', '.join(titles)}")
+    if existing is None or unique:
+        connection.execute(text("DROP INDEX IF EXISTS idx_movies_user_title_nocase"))
+        connection.execute(text(f"""
+            CREATE {unique} INDEX idx_movies_user_title_nocase
+            ON movies (user_id, title COLLATE NOCASE)
+        """))
+
+
+def _create_title_search(connection):
+    """
+    Full-text title index (FTS5), kept in sync with movies by triggers.
+    Skipped if this SQLite build has no FTS5; search then falls back to LIKE.
+    """
+    try:
+        connection.execute(text("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+                title,
+                content = 'movies',
+                content_rowid = 'id',
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        """))
+    except OperationalError as e:
+        print(f"Full-text search unavailable, using LIKE instead: {e}")
+        return
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN
+            INSERT INTO movies_fts (rowid, title) VALUES (new.id, new.title);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN
+            INSERT INTO movies_fts (movies_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS movies_fts_update AFTER UPDATE OF title ON movies BEGIN
+            INSERT INTO movies_fts (movies_fts, rowid, title) VALUES ('delete', old.id, old.title);
+            INSERT INTO movies_fts (rowid, title) VALUES (new.id, new.title);
+        END
+    """))
+    # Index the titles that were already in the table
+    connection.execute(text("INSERT INTO movies_fts (movies_fts) VALUES ('rebuild')"))
+
+
+def _add_collection_versions(connection):
+    """
+    Per-user change counter, bumped by triggers on every movie write, and the
+    site_builds table that remembers which counter a user's website was built at.
+    """
+    columns = [row[1] for row in connection.execute(text("PRAGMA table_info(users)"))]
+    if "collection_version" not in columns:
+        connection.execute(text(
+            "ALTER TABLE users ADD COLUMN collection_version INTEGER NOT NULL DEFAULT 0"
+        ))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS movies_version_insert AFTER INSERT ON movies BEGIN
+            UPDATE users SET collection_version = collection_version + 1 WHERE id = new.user_id;
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS movies_version_delete AFTER DELETE ON movies BEGIN
+            UPDATE users SET collection_version = collection_version + 1 WHERE id = old.user_id;
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS movies_version_update AFTER UPDATE ON movies BEGIN
+            UPDATE users SET collection_version = collection_version + 1
+            WHERE id IN (old.user_id, new.user_id);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS site_builds (
+            user_id INTEGER PRIMARY KEY REFERENCES users (id),
+            collection_version INTEGER NOT NULL,
+            build_key TEXT NOT NULL,
+            output_file TEXT NOT NULL
+        )
+    """))
+
+
+def _create_poster_mirror(connection):
+    """Remote poster URL -> local content-addressed copy under _static/posters."""
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS poster_mirror (
+            url TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            thumbnail_path TEXT,
+            fetched_at TEXT NOT NULL
+        )
+    """))
+
+
+def _add_rating_refresh(connection):
+    """
+    When each row's rating was last refreshed from OMDb (NULL = never), a
+    title index across users for fanning refreshed ratings out, and the
+    refresh_runs table that lets an interrupted refresh resume.
+    """
+    columns = [row[1] for row in connection.execute(text("PRAGMA table_info(movies)"))]
+    if "rating_refreshed_at" not in columns:
+        connection.execute(text("ALTER TABLE movies ADD COLUMN rating_refreshed_at TEXT"))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_movies_title_nocase ON movies (title COLLATE NOCASE)"
+    ))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS refresh_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT NOT NULL,
+            cutoff TEXT NOT NULL,
+            finished_at TEXT
+        )
+    """))
+
+
+def _create_catalog(connection):
+    """
+    Split movies into a shared catalog and a per-user link table.
+
+    catalog holds title, year, IMDb rating and poster once per movie, keyed
+    by (title NOCASE, year). user_movies holds which user owns which catalog
+    entry, the title as that user spelled it, and the user's own rating and
+    poster, NULL meaning "use the catalog's". movies becomes a view joining
+    the two, so read queries keep working unchanged. Rows that only differed
+    in title case, rating or poster share one catalog entry; every owner keeps
+    their own spelling, and a differing rating or poster as their override.
+    """
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS catalog (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            rating REAL NOT NULL,
+            poster_url TEXT,
+            rating_refreshed_at TEXT
+        )
+    """))
+    connection.execute(text("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_catalog_title_year
+        ON catalog (title COLLATE NOCASE, year)
+    """))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS user_movies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            catalog_id INTEGER NOT NULL REFERENCES catalog (id),
+            rating REAL, -- NULL = catalog rating
+            title TEXT,
+            poster_url TEXT -- NULL = catalog poster
+        )
+    """))
+    connection.execute(text("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_user_movies_user_catalog
+        ON user_movies (user_id, catalog_id)
+    """))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_user_movies_catalog ON user_movies (catalog_id)"
+    ))
+
+    # The oldest row of each (title, year) becomes the catalog entry
+    connection.execute(text("""
+        INSERT INTO catalog (title, year, rating, poster_url, rating_refreshed_at)
+        SELECT m.title, m.year, m.rating,
+               COALESCE(m.poster_url, (
+                   SELECT MAX(o.poster_url) FROM movies AS o
+                   WHERE o.title = m.title COLLATE NOCASE AND o.year = m.year
+               )),
+               m.rating_refreshed_at
+        FROM movies AS m
+        WHERE m.id IN (SELECT MIN(id) FROM movies GROUP BY title COLLATE NOCASE, year)
+        ORDER BY m.id
+    """))
+    # Keep the row ids, so keyset page positions survive the migration
+    connection.execute(text("""
+        INSERT OR IGNORE INTO user_movies (id, user_id, catalog_id, rating, title, poster_url)
+        SELECT m.id, m.user_id, c.id, NULLIF(m.rating, c.rating), m.title,
+               NULLIF(m.poster_url, c.poster_url)
+        FROM movies AS m
+        JOIN catalog AS c ON c.title = m.title COLLATE NOCASE AND c.year = m.year
+        ORDER BY m.id
+    """))
+
+    for trigger in ("movies_fts_insert", "movies_fts_delete", "movies_fts_update",
+                    "movies_version_insert", "movies_version_delete", "movies_version_update"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    connection.execute(text("DROP TABLE IF EXISTS movies_fts"))
+    connection.execute(text("DROP TABLE movies"))
+    connection.execute(text("""
+        CREATE VIEW movies AS
+        SELECT um.id AS id, um.title AS title, c.year AS year,
+               COALESCE(um.rating, c.rating) AS rating,
+               COALESCE(um.poster_url, c.poster_url) AS poster_url,
+               um.user_id AS user_id, um.catalog_id AS catalog_id
+        FROM user_movies AS um
+        JOIN catalog AS c ON c.id = um.catalog_id
+    """))
+
+    # collection_version moves when a user's links change, or when a catalog
+    # entry they own does (e.g. a rating refresh)
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS user_movies_version_insert AFTER INSERT ON user_movies BEGIN
+            UPDATE users SET collection_version = collection_version + 1 WHERE id = new.user_id;
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS user_movies_version_delete AFTER DELETE ON user_movies BEGIN
+            UPDATE users SET collection_version = collection_version + 1 WHERE id = old.user_id;
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS user_movies_version_update AFTER UPDATE ON user_movies BEGIN
+            UPDATE users SET collection_version = collection_version + 1
+            WHERE id IN (old.user_id, new.user_id);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS catalog_version_update
+        AFTER UPDATE OF title, year, rating, poster_url ON catalog BEGIN
+            UPDATE users SET collection_version = collection_version + 1
+            WHERE id IN (SELECT user_id FROM user_movies WHERE catalog_id = new.id);
+        END
+    """))
+    _create_catalog_search(connection)
+
+
+def _create_catalog_search(connection):
+    """Full-text index over catalog titles; same fallback as _create_title_search."""
+    try:
+        connection.execute(text("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5(
+                title,
+                content = 'catalog',
+                content_rowid = 'id',
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        """))
+    except OperationalError as e:
+        print(f"Full-text search unavailable, using LIKE instead: {e}")
+        return
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS catalog_fts_insert AFTER INSERT ON catalog BEGIN
+            INSERT INTO catalog_fts (rowid, title) VALUES (new.id, new.title);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS catalog_fts_delete AFTER DELETE ON catalog BEGIN
+            INSERT INTO catalog_fts (catalog_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS catalog_fts_update AFTER UPDATE OF title ON catalog BEGIN
+            INSERT INTO catalog_fts (catalog_fts, rowid, title) VALUES ('delete', old.id, old.title);
+            INSERT INTO catalog_fts (rowid, title) VALUES (new.id, new.title);
+        END
+    """))
+    connection.execute(text("INSERT INTO catalog_fts (catalog_fts) VALUES ('rebuild')"))
+
+
+# ---------- PER-USER STATS ----------
+#
+# user_stats keeps count, rating sum, min, max and a best / worst movie per
+# user; user_rating_bins counts movies per 0.1 rating bin, which gives the
+# median without reading the collection. Triggers on user_movies and catalog
+# keep both current. Adding a rating is always O(1); removing one only
+# re-reads the user's rows when it was the min, max, best or worst.
+
+def _rating_bin(rating):
+    return f"CAST(round(({rating}) * 10) AS INTEGER)"
+
+
+def _stats_add(user, movie, rating):
+    """Trigger statements counting one movie of `user` (SQL expressions)."""
+    return f"""
+        INSERT INTO user_stats (user_id, movie_count, rating_sum, min_rating, max_rating,
+                                best_movie_id, worst_movie_id)
+        VALUES ({user}, 1, {rating}, {rating}, {rating}, {movie}, {movie})
+        ON CONFLICT (user_id) DO UPDATE SET
+            movie_count = movie_count + 1,
+            rating_sum = rating_sum + excluded.rating_sum,
+            best_movie_id = CASE WHEN max_rating IS NULL OR excluded.max_rating > max_rating
+                                 THEN excluded.best_movie_id ELSE best_movie_id END,
+            worst_movie_id = CASE WHEN min_rating IS NULL OR excluded.min_rating < min_rating
+                                  THEN excluded.worst_movie_id ELSE worst_movie_id END,
+            max_rating = max(coalesce(max_rating, excluded.max_rating), excluded.max_rating),
+            min_rating = min(coalesce(min_rating, excluded.min_rating), excluded.min_rating);
+        INSERT INTO user_rating_bins (user_id, bin, movies)
+        VALUES ({user}, {_rating_bin(rating)}, 1)
+        ON CONFLICT (user_id, bin) DO UPDATE SET movies = movies + 1;
+    """
+
+
+def _stats_remove(user, movie, rating):
+    """Trigger statements un-counting one movie; runs after the row changed."""
+    return f"""
+        UPDATE user_stats SET movie_count = movie_count - 1, rating_sum = rating_sum - ({rating})
+        WHERE user_id = {user};
+        UPDATE user_rating_bins SET movies = movies - 1
+        WHERE user_id = {user} AND bin = {_rating_bin(rating)};
+        {_stats_refresh_extremes(f"user_id = {user} AND ({movie} IN (best_movie_id, worst_movie_id) "
+                                 f"OR ({rating}) <= min_rating OR ({rating}) >= max_rating)")}
+    """
+
+
+def _stats_refresh_extremes(where):
+    """Re-read min / max / best / worst from the movies view for matching users."""
+    return f"""
+        UPDATE user_stats SET
+            min_rating = (SELECT MIN(rating) FROM movies WHERE user_id = user_stats.user_id),
+            max_rating = (SELECT MAX(rating) FROM movies WHERE user_id = user_stats.user_id),
+            best_movie_id = (SELECT id FROM movies WHERE user_id = user_stats.user_id
+                             AND rating = (SELECT MAX(rating) FROM movies
+                                           WHERE user_id = user_stats.user_id)
+                             ORDER BY title COLLATE NOCASE LIMIT 1),
+            worst_movie_id = (SELECT id FROM movies WHERE user_id = user_stats.user_id
+                              AND rating = (SELECT MIN(rating) FROM movies
+                                            WHERE user_id = user_stats.user_id)
+                              ORDER BY title COLLATE NOCASE LIMIT 1)
+        WHERE {where};
+    """
+
+
+def _user_rating(link):
+    """A user_movies row's effective rating (override, else catalog)."""
+    return f"coalesce({link}.rating, (SELECT rating FROM catalog WHERE id = {link}.catalog_id))"
+
+
+def _create_user_movies_stats_triggers(connection, deferrable=False, user_rating=_user_rating):
+    """
+    The user_movies triggers of user_stats. With deferrable=True they skip
+    users listed in stats_deferred; see _add_stats_deferral. user_rating(row)
+    gives the SQL for a row's effective rating.
+    """
+    when = {
+        event: f"WHEN {row}.user_id NOT IN (SELECT user_id FROM stats_deferred)" if deferrable else ""
+        for event, row in (("insert", "new"), ("delete", "old"), ("update", "new"))
+    }
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS user_movies_stats_insert AFTER INSERT ON user_movies
+        {when["insert"]} BEGIN
+            {_stats_add("new.user_id", "new.id", user_rating("new"))}
+        END
+    """))
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS user_movies_stats_delete AFTER DELETE ON user_movies
+        {when["delete"]} BEGIN
+            {_stats_remove("old.user_id", "old.id", user_rating("old"))}
+        END
+    """))
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS user_movies_stats_update
+        AFTER UPDATE OF rating ON user_movies {when["update"]} BEGIN
+            {_stats_remove("old.user_id", "old.id", user_rating("old"))}
+            {_stats_add("new.user_id", "new.id", user_rating("new"))}
+        END
+    """))
+
+
+def _create_user_stats(connection):
+    """Materialized per-user stats and rating bins, kept current by triggers."""
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id INTEGER PRIMARY KEY REFERENCES users (id),
+            movie_count INTEGER NOT NULL,
+            rating_sum REAL NOT NULL,
+            min_rating REAL,
+            max_rating REAL,
+            best_movie_id INTEGER,
+            worst_movie_id INTEGER
+        )
+    """))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS user_rating_bins (
+            user_id INTEGER NOT NULL,
+            bin INTEGER NOT NULL,       -- rating * 10, rounded
+            movies INTEGER NOT NULL,
+            PRIMARY KEY (user_id, bin)
+        ) WITHOUT ROWID
+    """))
+    _create_user_movies_stats_triggers(connection)
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS catalog_stats_update
+        AFTER UPDATE OF rating ON catalog WHEN old.rating IS NOT new.rating BEGIN
+            {_catalog_rating_stats()}
+        END
+    """))
+    rebuild_user_stats(connection)
+
+
+def _catalog_rating_stats():
+    """Trigger statements: a catalog rating change moves every owner without an override."""
+    owners = "SELECT user_id FROM user_movies WHERE catalog_id = new.id AND rating IS NULL"
+    return f"""
+        UPDATE user_stats SET rating_sum = rating_sum - old.rating + new.rating
+        WHERE user_id IN ({owners});
+        UPDATE user_rating_bins SET movies = movies - 1
+        WHERE bin = {_rating_bin("old.rating")} AND user_id IN ({owners});
+        INSERT INTO user_rating_bins (user_id, bin, movies)
+        SELECT user_id, {_rating_bin("new.rating")}, 1
+        FROM user_movies WHERE catalog_id = new.id AND rating IS NULL
+        ON CONFLICT (user_id, bin) DO UPDATE SET movies = movies + 1;
+        {_stats_refresh_extremes(f"user_id IN ({owners}) AND ("
+                                 "old.rating <= min_rating OR old.rating >= max_rating "
+                                 "OR new.rating <= min_rating OR new.rating >= max_rating)")}
+    """
+
+
+def rebuild_user_stats(connection, user_ids=None):
+    """Recompute user_stats and user_rating_bins from the movies view."""
+    where = ""
+    params = {}
+    if user_ids is not None:
+        where = "WHERE user_id IN (SELECT value FROM json_each(:user_ids))"
+        params["user_ids"] = json.dumps(list(user_ids))
+    connection.execute(text(f"DELETE FROM user_stats {where}"), params)
+    connection.execute(text(f"DELETE FROM user_rating_bins {where}"), params)
+    connection.execute(text(f"""
+        INSERT INTO user_stats (user_id, movie_count, rating_sum)
+        SELECT user_id, COUNT(*), SUM(rating) FROM movies {where} GROUP BY user_id
+    """), params)
+    connection.execute(text(_stats_refresh_extremes("true" if user_ids is None else
+                                                    where.removeprefix("WHERE "))), params)
+    connection.execute(text(f"""
+        INSERT INTO user_rating_bins (user_id, bin, movies)
+        SELECT user_id, {_rating_bin("rating")}, COUNT(*) FROM movies {where} GROUP BY 1, 2
+    """), params)
+
+
+def _add_stats_deferral(connection):
+    """
+    Batch writes list their user in stats_deferred inside their transaction,
+    which switches the per-row stats triggers off for that user; they then
+    rebuild the user's stats once before committing. Row-by-row upkeep of
+    min / max costs a rescan per touched extreme, which mass updates hit often.
+    """
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS stats_deferred (user_id INTEGER PRIMARY KEY)"
+    ))
+    for trigger in ("user_movies_stats_insert", "user_movies_stats_delete",
+                    "user_movies_stats_update"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    _create_user_movies_stats_triggers(connection, deferrable=True)
+
+
+def _add_sort_keys(connection):
+    """
+    Copy each movie's sort keys into user_movies: year from the catalog,
+    effective_rating (the user's override, else the catalog rating), and the
+    title where the owner's own spelling is missing. The movies view reads
+    them from there, so per-user sorts, filters and title lookups seek
+    through (user_id, ...) indexes again instead of sorting the joined rows.
+    Writes to user_movies set all three; triggers carry catalog changes over.
+    """
+    columns = [row[1] for row in connection.execute(text("PRAGMA table_info(user_movies)"))]
+    for column in ("title TEXT", "year INTEGER", "effective_rating REAL", "poster_url TEXT"):
+        if column.split()[0] not in columns:
+            connection.execute(text(f"ALTER TABLE user_movies ADD COLUMN {column}"))
+    connection.execute(text("""
+        UPDATE user_movies SET
+            title = coalesce(title, (SELECT title FROM catalog WHERE id = user_movies.catalog_id)),
+            year = (SELECT year FROM catalog WHERE id = user_movies.catalog_id),
+            effective_rating = coalesce(
+                rating, (SELECT rating FROM catalog WHERE id = user_movies.catalog_id))
+    """))
+    # The names of the old movies table's indexes, now with the title as
+    # tie-breaker as the menu sorts: best first, and A-Z within a rating
+    connection.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_movies_user_title_nocase
+        ON user_movies (user_id, title COLLATE NOCASE)
+    """))
+    connection.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_movies_user_rating
+        ON user_movies (user_id, effective_rating DESC, title COLLATE NOCASE)
+    """))
+    connection.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_movies_user_year
+        ON user_movies (user_id, year, title COLLATE NOCASE)
+    """))
+
+    # LEFT JOIN: the catalog only supplies poster_url, and SQLite drops an
+    # unused LEFT JOIN on a primary key, so e.g. MIN(rating) reads one index
+    connection.execute(text("DROP VIEW movies"))
+    connection.execute(text("""
+        CREATE VIEW movies AS
+        SELECT um.id AS id, um.title AS title, um.year AS year,
+               um.effective_rating AS rating,
+               coalesce(um.poster_url, c.poster_url) AS poster_url,
+               um.user_id AS user_id, um.catalog_id AS catalog_id
+        FROM user_movies AS um
+        LEFT JOIN catalog AS c ON c.id = um.catalog_id
+    """))
+
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS catalog_sort_keys_update
+        AFTER UPDATE OF title, year ON catalog BEGIN
+            UPDATE user_movies SET title = new.title, year = new.year WHERE catalog_id = new.id;
+        END
+    """))
+    # Re-create the stats triggers for the index-friendly best / worst lookup;
+    # the owners' effective ratings must move before their stats are re-read
+    for trigger in ("user_movies_stats_insert", "user_movies_stats_delete",
+                    "user_movies_stats_update", "catalog_stats_update"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    _create_user_movies_stats_triggers(connection, deferrable=True)
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS catalog_rating_update
+        AFTER UPDATE OF rating ON catalog WHEN old.rating IS NOT new.rating BEGIN
+            UPDATE user_movies SET effective_rating = new.rating
+            WHERE catalog_id = new.id AND rating IS NULL;
+            {_catalog_rating_stats()}
+        END
+    """))
+
+
+def _keep_owner_data(connection):
+    """
+    Owners keep their own title spelling when a catalog title changes, and a
+    catalog entry is deleted with its last owner. The stats triggers read a
+    row's effective_rating instead of its catalog entry, which may already
+    be gone. Databases migrated before user_movies kept the owner's poster
+    get the column (all NULL: the catalog's poster) and the view reading it.
+    """
+    columns = [row[1] for row in connection.execute(text("PRAGMA table_info(user_movies)"))]
+    if "poster_url" not in columns:
+        connection.execute(text("ALTER TABLE user_movies ADD COLUMN poster_url TEXT"))
+        connection.execute(text("DROP VIEW movies"))
+        connection.execute(text("""
+            CREATE VIEW movies AS
+            SELECT um.id AS id, um.title AS title, um.year AS year,
+                   um.effective_rating AS rating,
+                   coalesce(um.poster_url, c.poster_url) AS poster_url,
+                   um.user_id AS user_id, um.catalog_id AS catalog_id
+            FROM user_movies AS um
+            LEFT JOIN catalog AS c ON c.id = um.catalog_id
+        """))
+
+    connection.execute(text("DROP TRIGGER IF EXISTS catalog_sort_keys_update"))
+    connection.execute(text("""
+        CREATE TRIGGER catalog_sort_keys_update
+        AFTER UPDATE OF title, year ON catalog BEGIN
+            UPDATE user_movies
+            SET title = CASE WHEN title = old.title THEN new.title ELSE title END,
+                year = new.year
+            WHERE catalog_id = new.id;
+        END
+    """))
+    for trigger in ("user_movies_stats_insert", "user_movies_stats_delete",
+                    "user_movies_stats_update"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    _create_user_movies_stats_triggers(connection, deferrable=True,
+                                       user_rating=lambda row: f"{row}.effective_rating")
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS user_movies_catalog_cleanup
+        AFTER DELETE ON user_movies
+        WHEN NOT EXISTS (SELECT 1 FROM user_movies WHERE catalog_id = old.catalog_id) BEGIN
+            DELETE FROM catalog WHERE id = old.catalog_id;
+        END
+    """))
+    connection.execute(text("""
+        DELETE FROM catalog
+        WHERE NOT EXISTS (SELECT 1 FROM user_movies WHERE catalog_id = catalog.id)
+    """))
+
+
+# Version number -> migration. Append new migrations; never reorder or edit
+# one that has shipped. Every step is safe on databases created before
+# versioning existed.
+MIGRATIONS = {
+    1: _create_base_tables,
+    2: ensure_title_index,
+    3: _create_title_search,
+    4: _add_collection_versions,
+    5: _create_poster_mirror,
+    6: _add_rating_refresh,
+    7: _create_catalog,
+    8: _create_user_stats,
+    9: _add_stats_deferral,
+    10: _add_sort_keys,
+    11: _keep_owner_data,
+}
+SCHEMA_VERSION = max(MIGRATIONS)
+
+
+def current_version(connection):
+    """Highest applied migration, 0 for a new (or pre-versioning) database."""
+    try:
+        return connection.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar() or 0
+    except OperationalError:
+        connection.rollback()
+        return 0
+
+
+def migrate(connection):
+    """Apply every pending migration, each in its own transaction: all or nothing."""
+    version = current_version(connection)
+    if version >= SCHEMA_VERSION:
+        return version
+
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            applied_at TEXT NOT NULL
+        )
+    """))
+    connection.commit()
+    for number in sorted(MIGRATIONS):
+        if number <= version:
+            continue
+        # pysqlite only opens its implicit transaction before INSERT / UPDATE /
+        # DELETE, so without an explicit BEGIN every CREATE, ALTER and DROP
+        # would commit on its own and a failing step would leave half its DDL
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            MIGRATIONS[number](connection)
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)"),
+                {"version": number, "applied_at": datetime.now(timezone.utc).isoformat()},
+            )
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            dbapi_connection = connection.connection.dbapi_connection
+            if dbapi_connection.in_transaction:
+                dbapi_connection.rollback()
+            raise
+    return SCHEMA_VERSION
@@ -0,0 +1,171 @@
+# storage/writer.py
+# Single writer thread with group commit for the SQL storage.
+#
+# Every mutation in movie_storage_sql is an "operation": a function that
+# takes a connection, runs its statements and returns a result, without
+# committing. Callers hand operations to the writer and get a Future back.
+# The writer thread takes whatever is queued (optionally waiting up to
+# commit_interval for more once the first arrives), runs the group in one BEGIN IMMEDIATE
+# transaction with a savepoint per operation, and commits once: one fsync
+# for the whole group, and a failing operation only rolls back itself.
+#
+# Inside a process, writes never compete for the SQLite lock. Between
+# processes they still can; a busy / locked error rolls the group back and
+# retries it with exponential backoff and jitter, for up to lock_timeout.
+# A retry runs every operation of the group again, so operations must build
+# their results afresh on each call instead of collecting them outside.
+# Readers are unaffected: under WAL they keep reading from their own pooled
+# connections. on_begin(connection) runs once the group holds the write lock
+# and on_commit(connection, whatever on_begin returned) after it committed.
+from __future__ import annotations
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy.exc import OperationalError
+
+import metrics
+
+_STOP = object()
+
+
+def is_lock_error(error: Exception) -> bool:
+    """True for SQLite's "database is locked" / "database is busy" errors."""
+    message = str(getattr(error, "orig", error)).lower()
+    return "locked" in message or "busy" in message
+
+
+class WriteQueue:
+    """One writer thread per engine; see the module comment."""
+
+    def __init__(self, engine, commit_interval: float = 0.0, max_batch: int = 256,
+                 busy_timeout_ms: int = 10, lock_timeout: float = 30.0, backoff: float = 0.001,
+                 max_backoff: float = 0.05, on_begin=None, on_commit=None):
+        self.engine = engine
+        self.on_begin = on_begin
+        self.on_commit = on_commit
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.busy_timeout_ms = busy_timeout_ms
+        self.lock_timeout = lock_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="storage-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, operation) -> Future:
+        """Queue operation(connection); the Future resolves after its group commits."""
+        future = Future()
+        self._queue.put(((operation, metrics.running_operations()), future))
+        return future
+
+    def close(self) -> None:
+        """Finish everything already queued, then stop the thread."""
+        if self._thread.is_alive():
+            self._queue.put((_STOP, None))
+            self._thread.join()
+
+    # ---------- WRITER THREAD ----------
+
+    def _next_group(self):
+        """
+        Block for one operation, then take whatever else is queued, waiting
+        up to commit_interval for more. With commit_interval 0 nothing waits
+        for company: operations queued during a commit make the next group.
+        """
+        group = [self._queue.get()]
+        deadline = time.monotonic() + self.commit_interval
+        while len(group) < self.max_batch and group[-1][0] is not _STOP:
+            remaining = deadline - time.monotonic()
+            try:
+                group.append(self._queue.get(timeout=remaining) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return group
+
+    def _run(self) -> None:
+        with self.engine.connect() as connection:
+            # Wait on the lock in our own short, jittered backoff instead of
+            # SQLite's busy handler, whose sleeps grow to 100 ms while other
+            # processes keep taking the lock back.
+            saved_timeout = connection.exec_driver_sql("PRAGMA busy_timeout").scalar()
+            connection.exec_driver_sql(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+            try:
+                while True:
+                    group = self._next_group()
+                    stop = group[-1][0] is _STOP
+                    if stop:
+                        group.pop()
+                    if group:
+                        self._commit_group(connection, group)
+                    if stop:
+                        return
+            finally:
+                connection.exec_driver_sql(f"PRAGMA busy_timeout = {int(saved_timeout)}")
+
+    def _commit_group(self, connection, group) -> None:
+        started = time.perf_counter()
+        delay = self.backoff
+        while True:
+            try:
+                results = self._run_group(connection, group)
+                break
+            except OperationalError as e:
+                self._rollback(connection)
+                if not is_lock_error(e) or time.perf_counter() - started > self.lock_timeout:
+                    for _, future in group:
+                        future.set_exception(e)
+                    return
+                metrics.count("storage.writer.retries")
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                delay = min(self.max_backoff, delay * 2)
+        metrics.observe("storage.writer.commit", time.perf_counter() - started)
+        metrics.count("storage.writer.groups")
+        metrics.count("storage.writer.operations", len(group))
+        for (_, future), (ok, value) in zip(group, results):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    @staticmethod
+    def _rollback(connection) -> None:
+        """
+        Roll back on the SQLAlchemy and the DBAPI level. A COMMIT that failed
+        with SQLITE_BUSY leaves SQLite's transaction open, while SQLAlchemy
+        already considers it over and its rollback() does nothing.
+        """
+        connection.rollback()
+        dbapi_connection = connection.connection.dbapi_connection
+        if dbapi_connection.in_transaction:
+            dbapi_connection.rollback()
+
+    def _run_group(self, connection, group):
+        """One transaction: [(True, result) or (False, exception), ...] per operation."""
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        state = self.on_begin(connection) if self.on_begin is not None else None
+        results = []
+        for (operation, charged), _ in group:
+            savepoint = connection.begin_nested()
+            try:
+                with metrics.charged_to(charged):
+                    value = operation(connection)
+            except OperationalError as e:
+                if is_lock_error(e):
+                    raise                   # retry the whole group
+                savepoint.rollback()
+                results.append((False, e))
+            except Exception as e:
+                savepoint.rollback()
+                results.append((False, e))
+            else:
+                savepoint.commit()
+                results.append((True, value))
+        connection.commit()
+        if self.on_commit is not None:
+            self.on_commit(connection, state)
+        return results
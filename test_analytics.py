@@ -0,0 +1,50 @@
+# ---------------------------------------------------------
+# test_analytics.py
+# Tester for analytics.py (Movie Project)
+# Compares the chunked single-pass report with plain SQL
+# ---------------------------------------------------------
+
+import os
+import tempfile
+
+from sqlalchemy import text
+
+import analytics
+import storage.movie_storage_sql as storage
+from benchmarks import synthetic
+
+with tempfile.TemporaryDirectory() as folder:
+    storage.configure(db_url=f"sqlite:///{folder}/movies.db")
+    synthetic.generate(users=20, movies=2_000, seed=3)
+
+    # Small chunks, so the accumulators have to combine many of them
+    report = analytics.collect(chunk_size=97).report(storage.get_all_users(), top=5)
+    print("Percentiles:", report["rating_percentiles"])
+    print("Most owned:", report["most_owned"][:3])
+
+    with storage.get_engine().connect() as connection:
+        count, average = connection.execute(text("SELECT COUNT(*), AVG(rating) FROM movies")).one()
+        decades = dict(connection.execute(text(
+            "SELECT (year / 10 * 10) || 's', COUNT(*) FROM movies GROUP BY 1 ORDER BY 1")).all())
+        owners = [row[0] for row in connection.execute(text(
+            "SELECT COUNT(*) FROM movies GROUP BY catalog_id ORDER BY 1 DESC LIMIT 5"))]
+        median = connection.execute(text("""
+            SELECT rating FROM movies ORDER BY rating
+            LIMIT 1 OFFSET (SELECT (COUNT(*) + 1) / 2 - 1 FROM movies)
+        """)).scalar()
+
+    assert report["movies"] == count
+    assert abs(report["average_rating"] - average) < 1e-9
+    assert report["decades"] == decades
+    assert [m["owners"] for m in report["most_owned"]] == owners
+    assert report["rating_percentiles"]["p50"] == median
+    assert sum(report["rating_histogram"].values()) == count
+    assert sum(report["users"]["sizes"].values()) == count
+
+    analytics.write_csv(report, os.path.join(folder, "csv"))
+    with open(os.path.join(folder, "csv", "decades.csv"), encoding="utf-8") as f:
+        assert f.readline().strip() == "decade,movies"
+
+    storage.configure()
+
+print("\nAnalytics report OK.")
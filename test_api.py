@@ -9,3 +9,7 @@ import movie_api
 print("Fetching Titanic...")
 year, rating, poster_url = movie_api.fetch_movie("Titanic")
 print("Year:", year, "Rating:", rating, "Poster:", poster_url)
+
+print("\nFetching Titanic again (should come from data/omdb_cache.db)...")
+year, rating, poster_url = movie_api.fetch_movie("  titanic ")
+print("Year:", year, "Rating:", rating, "Poster:", poster_url)
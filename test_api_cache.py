@@ -0,0 +1,140 @@
+# ---------------------------------------------------------
+# test_api_cache.py
+# Tester for the OMDb response cache in movie_api.py (Movie Project)
+# TTL expiry, LRU eviction, error payloads and single-flight lookups,
+# against a mocked requests session, no internet needed
+# ---------------------------------------------------------
+
+import os
+import tempfile
+import threading
+import time
+
+import movie_api
+
+FOUND = {"Response": "True", "Year": "1997", "imdbRating": "7.9", "Poster": "poster.jpg"}
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Stands in for requests.Session: answers from `answers`, counts requests."""
+
+    def __init__(self):
+        self.answers = {}       # title -> payload (FOUND when missing)
+        self.requests = []      # titles asked for, in order
+        self.gate = None        # threading.Event to hold requests on, if set
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        with self.lock:
+            self.requests.append(params["t"])
+        if self.gate is not None:
+            self.gate.wait()
+        return FakeResponse(self.answers.get(params["t"], FOUND))
+
+    def close(self):
+        pass
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as folder:
+        movie_api.CACHE_PATH = os.path.join(folder, "omdb_cache.db")
+        movie_api.CACHE_ENABLED = True
+        client = movie_api.OmdbClient(base_url="http://omdb.invalid/")
+        session = client.session = FakeSession()
+        movie_api.set_client(client)
+
+        # Second lookup (any spelling of the title) comes from the cache
+        assert movie_api.lookup_movie("Titanic") == (1997, 7.9, "poster.jpg")
+        assert movie_api.lookup_movie("  titanic ") == (1997, 7.9, "poster.jpg")
+        assert session.requests == ["Titanic"]
+
+        # "Movie not found!" is cached; other errors are asked again every time
+        session.answers["Nope"] = {"Response": "False", "Error": "Movie not found!"}
+        session.answers["Locked"] = {"Response": "False", "Error": "Invalid API key!"}
+        session.answers["Busy"] = {"Response": "False", "Error": "Request limit reached!"}
+        for _ in range(2):
+            for title in ("Nope", "Locked", "Busy"):
+                assert movie_api.lookup_movie(title) is None
+        assert session.requests[1:] == ["Nope", "Locked", "Busy", "Locked", "Busy"]
+        assert movie_api.cache_get("locked") is None
+        assert movie_api.cache_get("busy") is None
+        print("Error payloads OK.")
+
+        # Expired entries are fetched again, found and not-found alike
+        movie_api.CACHE_TTL = movie_api.NEGATIVE_CACHE_TTL = 0.05
+        time.sleep(0.1)
+        del session.requests[:]
+        movie_api.lookup_movie("Titanic")
+        movie_api.lookup_movie("Nope")
+        movie_api.lookup_movie("Titanic")
+        assert session.requests == ["Titanic", "Nope"]
+        movie_api.CACHE_TTL = movie_api.NEGATIVE_CACHE_TTL = 60
+        print("TTL expiry OK.")
+
+        # Past CACHE_MAX_ENTRIES the least recently used entry goes. A hit
+        # only counts as a use once CACHE_TOUCH_INTERVAL has passed
+        for interval, evicted in ((60, "one"), (0, "two")):
+            movie_api.clear_cache()
+            movie_api.CACHE_MAX_ENTRIES = 3
+            movie_api.CACHE_TOUCH_INTERVAL = interval
+            for title in ("One", "Two", "Three"):
+                movie_api.lookup_movie(title)
+                time.sleep(0.01)
+            movie_api.lookup_movie("One")        # hit: with interval 0 "Two" is now the oldest
+            time.sleep(0.01)
+            movie_api.lookup_movie("Four")
+            kept = {"one", "two", "three", "four"} - {evicted}
+            assert movie_api.cache_get(evicted) is None, interval
+            assert all(movie_api.cache_get(key) for key in kept), interval
+        movie_api.CACHE_MAX_ENTRIES = 10_000
+        movie_api.CACHE_TOUCH_INTERVAL = 60 * 60
+        print("LRU eviction OK.")
+
+        # Concurrent lookups of one title share a single request
+        del session.requests[:]
+        session.gate = threading.Event()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(movie_api.lookup_movie("Alien")))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        session.gate.set()
+        for thread in threads:
+            thread.join()
+        assert session.requests == ["Alien"]
+        assert results == [(1997, 7.9, "poster.jpg")] * 8
+
+        # A lookup that missed just before another leader stored the answer
+        # finds it when it becomes the leader itself, instead of asking again
+        session.gate = None
+        movie_api.cache_put("zodiac", FOUND)
+        cache_get = movie_api.cache_get
+        calls = []
+
+        def miss_once(key):
+            calls.append(key)
+            return None if len(calls) == 1 else cache_get(key)
+
+        movie_api.cache_get = miss_once
+        try:
+            assert movie_api.lookup_movie("Zodiac") == (1997, 7.9, "poster.jpg")
+        finally:
+            movie_api.cache_get = cache_get
+        assert session.requests == ["Alien"]
+        print("Single-flight OK.")
+
+        movie_api.close_cache()
+
+    print("\nOMDb cache OK.")
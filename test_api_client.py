@@ -0,0 +1,71 @@
+# ---------------------------------------------------------
+# test_api_client.py
+# Tester for movie_api.OmdbClient (Movie Project)
+# Runs against a local stand-in for OMDb, no internet needed
+# ---------------------------------------------------------
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import movie_api
+
+# How many times the fake server should fail before answering
+failures_left = {"count": 0}
+
+
+class FakeOmdbHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, so the pool can reuse connections
+
+    def do_GET(self):
+        if failures_left["count"] > 0:
+            failures_left["count"] -= 1
+            status, body = 503, b"{}"
+        else:
+            status = 200
+            body = json.dumps({"Response": "True", "Year": "1997",
+                               "imdbRating": "7.9", "Poster": "poster.jpg"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOmdbHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+client = movie_api.OmdbClient(base_url=base_url, backoff_factor=0.01)
+
+print("-- Plain lookup --")
+print(client.get_movie("Titanic"))
+
+print("\n-- Two 503s, then success --")
+failures_left["count"] = 2
+print(client.get_movie("Titanic"))
+assert client.retries == 2
+
+print("\n-- Retries used up --")
+failures_left["count"] = 10
+try:
+    client.get_movie("Titanic")
+    raise AssertionError("expected an HTTPError")
+except requests.exceptions.HTTPError as e:
+    print("Gave up as expected:", e)
+failures_left["count"] = 0
+
+print("\n-- fetch_movie through the shared client --")
+movie_api.set_client(client)
+movie_api.CACHE_ENABLED = False
+print(movie_api.fetch_movie("Titanic"))
+
+print("\n-- Metrics --")
+print(client.stats())
+
+server.shutdown()
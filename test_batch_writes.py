@@ -0,0 +1,55 @@
+# ---------------------------------------------------------
+# test_batch_writes.py
+# Tester for add_movies / update_movies / delete_movies (Movie Project)
+# Checks the per-row outcomes and that user stats stay correct
+# ---------------------------------------------------------
+
+import tempfile
+import time
+
+import storage.movie_storage_sql as storage
+
+with tempfile.TemporaryDirectory() as folder:
+    storage.configure(db_url=f"sqlite:///{folder}/movies.db")
+    user_id = storage.add_user("batch")["id"]
+
+    print("-- Add --")
+    outcomes = storage.add_movies(user_id, [
+        ("Heat", 1995, 8.3, None),
+        ("heat", 1995, 8.0, None),      # same title, different case
+        ("Alien", 1979, 8.5, None),
+        ("Broken", None, 7.0, None),    # no year
+    ])
+    print(outcomes)
+    assert [outcome for _, outcome in outcomes] == [
+        storage.INSERTED, storage.DUPLICATE, storage.INSERTED, storage.INVALID]
+
+    print("\n-- Upsert --")
+    outcomes = storage.add_movies(user_id, [("HEAT", 1995, 9.9, None), ("Dune", 2021, 8.0, None)],
+                                  upsert=True)
+    print(outcomes)
+    assert [outcome for _, outcome in outcomes] == [storage.UPDATED, storage.INSERTED]
+    assert storage.list_movies(user_id)["Heat"]["rating"] == 9.9
+
+    print("\n-- Update / delete --")
+    outcomes = storage.update_movies(user_id, [("alien", 2.0), ("Missing", 1.0)])
+    assert [outcome for _, outcome in outcomes] == [storage.UPDATED, storage.NOT_FOUND]
+    outcomes = storage.delete_movies(user_id, ["DUNE", "dune", "Missing"])
+    assert [outcome for _, outcome in outcomes] == [
+        storage.DELETED, storage.NOT_FOUND, storage.NOT_FOUND]
+    print(storage.list_movies(user_id))
+    assert set(storage.list_movies(user_id)) == {"Heat", "Alien"}
+
+    print("\n-- 20k rows --")
+    rows = [(f"Movie {i}", 1900 + i % 120, (i % 100) / 10, None) for i in range(20_000)]
+    started = time.perf_counter()
+    storage.add_movies(user_id, rows, batch_size=2_000)
+    storage.update_movies(user_id, [(row[0], 5.0) for row in rows[::2]], batch_size=2_000)
+    storage.delete_movies(user_id, [row[0] for row in rows[1::4]], batch_size=2_000)
+    print(f"add + update + delete: {time.perf_counter() - started:.2f}s")
+    assert storage.count_movies(user_id) == 2 + 15_000
+    assert storage.verify_user_stats() == []
+
+    storage.configure()
+
+print("\nBatch writes OK.")
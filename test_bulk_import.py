@@ -0,0 +1,85 @@
+# ---------------------------------------------------------
+# test_bulk_import.py
+# Tester for bulk_import.py (Movie Project)
+# Resolves titles against a local stand-in for OMDb: unknown and
+# unreadable answers are reported as unresolved, the rest imported
+# ---------------------------------------------------------
+
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import bulk_import
+import movie_api
+import storage.movie_storage_sql as storage
+
+# title -> OMDb payload; anything else is unknown
+ANSWERS = {
+    "heat": {"Year": "1995", "imdbRating": "8.3"},
+    "the office": {"Year": "2005–2013", "imdbRating": "9.0"},   # series: ranged year
+    "broken": {"Year": "2001", "imdbRating": "not a number"},
+    "no rating": {"Year": "2010", "imdbRating": "N/A"},
+}
+
+
+class FakeOmdbHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        title = parse_qs(urlparse(self.path).query)["t"][0]
+        if title.lower() in ANSWERS:
+            body = dict(ANSWERS[title.lower()], Response="True", Poster="N/A")
+        else:
+            body = {"Response": "False", "Error": "Movie not found!"}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOmdbHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+movie_api.set_client(movie_api.OmdbClient(base_url=f"http://127.0.0.1:{server.server_address[1]}/"))
+movie_api.CACHE_ENABLED = False
+
+with tempfile.TemporaryDirectory() as folder:
+    storage.configure(db_url=f"sqlite:///{folder}/movies.db")
+    user_id = bulk_import.get_or_create_user("importer")["id"]
+
+    titles = bulk_import.read_titles(["Heat", "broken", "The Office", "heat", "Nope", "No Rating"])
+    inserted, unresolved = bulk_import.bulk_import(user_id, titles, workers=4, rate=0,
+                                                   batch_size=2)
+    print("Inserted:", inserted, "unresolved:", unresolved)
+    assert inserted == 2
+    assert unresolved == ["broken", "Nope", "No Rating"]
+    movies = storage.list_movies(user_id)
+    assert movies["Heat"]["year"] == 1995
+    assert movies["The Office"] == {"year": 2005, "rating": 9.0, "poster_url": None}
+
+    # Cached titles don't wait for the rate limiter, only real requests do
+    movie_api.CACHE_PATH = os.path.join(folder, "omdb_cache.db")
+    movie_api.CACHE_ENABLED = True
+    cached = [f"Cached {i}" for i in range(5)]
+    for title in cached:
+        movie_api.cache_put(movie_api.normalize_title(title),
+                            {"Response": "True", "Year": "2000", "imdbRating": "7.0"})
+    started = time.perf_counter()
+    inserted, unresolved = bulk_import.bulk_import(user_id, cached, workers=1, rate=1)
+    assert inserted == 5 and unresolved == []
+    assert time.perf_counter() - started < 1, "cache hits were rate limited"
+    movie_api.close_cache()
+    movie_api.CACHE_ENABLED = False
+
+    storage.configure()
+
+server.shutdown()
+print("\nBulk import OK.")
@@ -0,0 +1,133 @@
+# ---------------------------------------------------------
+# test_catalog.py
+# Tester for the shared catalog behind the movies view (Movie Project)
+# Every owner keeps their own spelling and poster, case variants of
+# other years stay apart, and unowned catalog entries go away,
+# both for new writes and for collections migrated from movies
+# ---------------------------------------------------------
+
+import contextlib
+import io
+import tempfile
+
+from sqlalchemy import create_engine, text
+
+import storage.movie_storage_sql as storage
+from storage import schema
+
+
+def catalog_titles():
+    with storage.get_engine().connect() as connection:
+        rows = connection.execute(text("SELECT title, year FROM catalog ORDER BY id")).fetchall()
+    return [tuple(row) for row in rows]
+
+
+def build_old_database(db_url):
+    """A database at schema version 6: one movies row per user and title."""
+    engine = create_engine(db_url)
+    with engine.connect() as connection, contextlib.redirect_stdout(io.StringIO()):
+        connection.execute(text("""
+            CREATE TABLE schema_migrations (version INTEGER PRIMARY KEY, applied_at TEXT NOT NULL)
+        """))
+        for number in range(1, 7):
+            schema.MIGRATIONS[number](connection)
+            connection.execute(text("INSERT INTO schema_migrations VALUES (:number, 'then')"),
+                               {"number": number})
+            if number == 1:
+                # Before the NOCASE index: carol's case variants of two years
+                connection.execute(text("""
+                    INSERT INTO users (id, name) VALUES (1, 'alice'), (2, 'bob'), (3, 'carol')
+                """))
+                connection.execute(text("""
+                    INSERT INTO movies (title, year, rating, poster_url, user_id) VALUES
+                        ('Heat', 1995, 8.3, 'h', 1),
+                        ('HEAT', 1995, 7.0, 'h2', 2),
+                        ('ALIEN', 1986, 8.4, NULL, 1),
+                        ('Alien', 1979, 8.5, 'a', 3),
+                        ('alien', 1986, 8.4, NULL, 3)
+                """))
+        connection.commit()
+    engine.dispose()
+
+
+with tempfile.TemporaryDirectory() as folder, contextlib.redirect_stdout(io.StringIO()):
+    storage.configure(db_url=f"sqlite:///{folder}/movies.db")
+    alice = storage.add_user("alice")["id"]
+    bob = storage.add_user("bob")["id"]
+
+    # The second owner's spelling and poster are their own
+    storage.add_movie(alice, "Foo", 2001, 6.0)
+    storage.add_movie(bob, "foo", 2001, 7.0, "bob.jpg")
+    assert storage.list_movies(alice) == {"Foo": {"year": 2001, "rating": 6.0, "poster_url": None}}
+    assert storage.list_movies(bob) == {"foo": {"year": 2001, "rating": 7.0,
+                                                "poster_url": "bob.jpg"}}
+    assert storage.get_movie(bob, "FOO")["title"] == "foo"
+    assert catalog_titles() == [("Foo", 2001)]
+
+    # Batch adds keep them too; the catalog entry goes with its last owner
+    storage.add_movies(bob, [("BAR", 1990, 5.0, "bar.jpg")])
+    storage.add_movies(alice, [("bar", 1990, 5.0, None)])
+    assert storage.list_movies(alice)["bar"]["poster_url"] == "bar.jpg"   # the catalog's
+    storage.delete_movie(alice, "foo")
+    assert catalog_titles() == [("Foo", 2001), ("BAR", 1990)]
+    storage.delete_movie(bob, "Foo")
+    storage.delete_movies(bob, ["bar"])
+    assert catalog_titles() == [("BAR", 1990)]
+    storage.delete_movies(alice, ["Bar"])
+    assert catalog_titles() == []
+    assert storage.verify_user_stats() == []
+    storage.configure()
+
+    # Migrating movies into the catalog keeps every owner's own data
+    db_url = f"sqlite:///{folder}/old.db"
+    build_old_database(db_url)
+    storage.configure(db_url=db_url)
+
+    # A step that fails partway leaves none of its DDL behind
+    keep_owner_data = schema.MIGRATIONS[11]
+
+    def failing_step(connection):
+        keep_owner_data(connection)
+        raise RuntimeError("step 11 failed")
+
+    schema.MIGRATIONS[11] = failing_step
+    try:
+        storage.get_engine()
+        raise AssertionError("the failing migration went through")
+    except RuntimeError:
+        pass
+    finally:
+        schema.MIGRATIONS[11] = keep_owner_data
+    engine = create_engine(db_url)
+    with engine.connect() as connection:
+        assert schema.current_version(connection) == 10
+        assert connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'user_movies_catalog_cleanup'"
+        )).fetchone() is None
+    engine.dispose()
+    assert storage.list_movies(1) == {
+        "Heat": {"year": 1995, "rating": 8.3, "poster_url": "h"},
+        "ALIEN": {"year": 1986, "rating": 8.4, "poster_url": None},
+    }
+    assert storage.list_movies(2) == {"HEAT": {"year": 1995, "rating": 7.0, "poster_url": "h2"}}
+    assert storage.list_movies(3) == {
+        "Alien": {"year": 1979, "rating": 8.5, "poster_url": "a"},
+        "alien": {"year": 1986, "rating": 8.4, "poster_url": None},
+    }
+    assert storage.verify_user_stats() == []
+
+    # Case variants: the exact spelling, or the given year, picks the row
+    assert storage.get_movie(3, "alien")["year"] == 1986
+    assert storage.get_movie(3, "ALIEN", 1979)["title"] == "Alien"
+    assert storage.update_movie(3, "Alien", 9.0)
+    assert storage.list_movies(3)["alien"]["rating"] == 8.4
+    assert storage.delete_movie(3, "alien")
+    assert list(storage.list_movies(3)) == ["Alien"]
+    assert not storage.delete_movie(3, "alien", 1986)
+    assert storage.delete_movie(1, "alien")
+    assert ("ALIEN", 1986) not in catalog_titles()
+    assert storage.verify_user_stats() == []
+
+    storage.configure()
+
+print("Shared catalog OK.")
@@ -0,0 +1,71 @@
+# ---------------------------------------------------------
+# test_collection_cache.py
+# Tester for the list_movies collection cache (Movie Project)
+# Our own writes forget only the written user's collection;
+# a commit by another connection drops them all; with nothing
+# cached, writes skip the data_version bookkeeping
+# ---------------------------------------------------------
+
+import contextlib
+import io
+import sqlite3
+import tempfile
+
+from sqlalchemy import event
+
+import storage.movie_storage_sql as storage
+
+storage.COLLECTION_CACHE_ENABLED = True   # off by default
+
+with tempfile.TemporaryDirectory() as folder:
+    storage.configure(db_url=f"sqlite:///{folder}/movies.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        alice = storage.add_user("alice")["id"]
+        bob = storage.add_user("bob")["id"]
+        storage.add_movie(alice, "Heat", 1995, 8.3)
+        storage.add_movie(bob, "Alien", 1979, 8.5)
+
+    for use_queue in (True, False):
+        storage.WRITE_QUEUE_ENABLED = use_queue
+        storage.clear_collection_cache()
+        storage.list_movies(alice)
+        storage.list_movies(bob)
+        before = storage.collection_cache_stats()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.update_movie(alice, "Heat", 9.0)
+        storage.list_movies(bob)
+        assert storage.list_movies(alice)["Heat"]["rating"] == 9.0
+        stats = storage.collection_cache_stats()
+        print("queue" if use_queue else "direct", stats)
+        assert stats["hits"] == before["hits"] + 1, "bob's collection should stay cached"
+        assert stats["invalidations"] == before["invalidations"] + 1
+
+        # Another connection (as another process would) commits: everything goes
+        other = sqlite3.connect(f"{folder}/movies.db")
+        other.execute("UPDATE catalog SET rating = 1.0 WHERE title = 'Alien'")
+        other.commit()
+        other.close()
+        assert storage.list_movies(bob)["Alien"]["rating"] == 1.0
+        assert storage.collection_cache_stats()["invalidations"] == stats["invalidations"] + 1
+
+    # Nothing cached: writes don't look at data_version at all
+    statements = []
+    event.listen(storage.get_engine(), "before_cursor_execute",
+                 lambda connection, cursor, statement, *args: statements.append(statement))
+    for use_queue in (True, False):
+        storage.WRITE_QUEUE_ENABLED = use_queue
+        storage.clear_collection_cache()
+        del statements[:]
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.update_movie(alice, "Heat", 7.0)
+        assert statements and not any("data_version" in s for s in statements), statements
+        # ...and the next read still sees the write
+        assert storage.list_movies(alice)["Heat"]["rating"] == 7.0
+        assert storage.list_movies(alice)["Heat"]["rating"] == 7.0
+
+    storage.WRITE_QUEUE_ENABLED = True
+    storage.COLLECTION_CACHE_ENABLED = False
+    storage.configure()
+
+print("\nCollection cache OK.")
@@ -0,0 +1,68 @@
+# ---------------------------------------------------------
+# test_columns.py
+# Tester for storage/columns.py (Movie Project)
+# Checks that stats, sorting and filtering over a MovieColumns
+# agree with the SQL versions in the storage layer
+# ---------------------------------------------------------
+
+import contextlib
+import io
+import tempfile
+
+import storage.columns as movie_columns
+import storage.movie_storage_sql as storage
+from benchmarks import synthetic
+
+with tempfile.TemporaryDirectory() as folder:
+    storage.configure(db_url=f"sqlite:///{folder}/movies.db")
+    user_id = synthetic.generate(users=3, movies=600, seed=7)[0]
+
+    columns = storage.load_movie_columns(user_id)
+    print(len(columns), "movies, first:", columns.row(0))
+    assert columns.to_dict() == storage.list_movies(user_id)
+
+    stats = columns.statistics()
+    expected = storage.get_statistics(user_id)
+    print("Stats:", stats)
+    assert stats["count"] == expected["count"]
+    assert abs(stats["average"] - expected["average"]) < 1e-9
+    for key in ("median", "min", "max", "best_titles", "worst_titles"):
+        assert stats[key] == expected[key], key
+
+    by_rating = columns.take(columns.order_by("rating", descending=True))
+    assert by_rating.titles == list(storage.query_movies(user_id, sort_by="rating",
+                                                         descending=True))
+    by_year = columns.take(columns.order_by("year"))
+    assert by_year.titles == list(storage.query_movies(user_id, sort_by="year"))
+
+    filtered = columns.take(columns.where(min_rating=6.5, start_year=1950, end_year=2000))
+    assert filtered.to_dict() == storage.query_movies(
+        user_id, min_rating=6.5, start_year=1950, end_year=2000)
+    print("Filtered:", len(filtered), "movies")
+
+    # Titles sort like SQLite's NOCASE: only A-Z fold, so "Ézra" sorts before "écran"
+    with contextlib.redirect_stdout(io.StringIO()):
+        for title in ("écran", "Ézra", "eagle", "Zorro"):
+            storage.add_movie(user_id, title, 1990, 5.0)
+    columns = storage.load_movie_columns(user_id)
+    by_title = columns.take(columns.order_by("title", descending=True))
+    assert by_title.titles == list(storage.query_movies(user_id, sort_by="title",
+                                                        descending=True))
+
+    # The NumPy path (when installed) and the builtin one agree
+    orders = [("rating", True), ("rating", False), ("year", True), ("year", False)]
+    filters = [{"min_rating": 6.5}, {"start_year": 1950, "end_year": 2000},
+               {"min_rating": 3, "end_year": 1980}]
+    results = [[columns.order_by(*order) for order in orders],
+               [columns.where(**bounds) for bounds in filters]]
+    numpy, movie_columns.numpy = movie_columns.numpy, None
+    try:
+        assert results == [[columns.order_by(*order) for order in orders],
+                           [columns.where(**bounds) for bounds in filters]]
+    finally:
+        movie_columns.numpy = numpy
+    print("NumPy path:", "checked" if numpy is not None else "not installed")
+
+    storage.configure()
+
+print("\nColumnar collection OK.")
@@ -0,0 +1,85 @@
+# ---------------------------------------------------------
+# test_poster_mirror.py
+# Tester for poster_mirror.py (Movie Project)
+# Serves posters from a local stand-in server and checks that
+# a second run downloads nothing
+# ---------------------------------------------------------
+
+import base64
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import poster_mirror
+import storage.movie_storage_sql as storage
+
+# 1x1 transparent PNG
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+requests_served = []
+
+
+class FakePosterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        requests_served.append(self.path)
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(PNG)))
+        self.end_headers()
+        self.wfile.write(PNG)
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), FakePosterHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+with tempfile.TemporaryDirectory() as folder:
+    storage.configure(db_url=f"sqlite:///{folder}/movies.db")
+    poster_mirror.STATIC_FOLDER = folder
+
+    # Two URLs with the same image, plus one that fails
+    urls = [f"{base_url}/a.png", f"{base_url}/b.png", f"{base_url}/missing.png"]
+
+    print("-- First run --")
+    local = poster_mirror.mirror_posters(urls, workers=3)
+    print(local)
+    assert len(local) == 2
+    assert local[urls[0]] == local[urls[1]], "same content should be stored once"
+    assert os.path.exists(os.path.join(folder, local[urls[0]]))
+
+    print("\n-- Second run (only the failed URL is retried) --")
+    requests_served.clear()
+    again = poster_mirror.mirror_posters(urls, workers=3)
+    print("Requests:", requests_served)
+    assert again == local
+    assert requests_served == ["/missing.png"]
+
+    print("\n-- Thumbnail deleted: rebuilt from the local original --")
+    thumbnail = os.path.join(folder, local[urls[0]])
+    if poster_mirror.Image is not None:
+        assert local[urls[0]].endswith(".thumb.jpg")
+    os.remove(thumbnail)
+    requests_served.clear()
+    rebuilt = poster_mirror.mirror_posters(urls, workers=3)
+    print("Requests:", requests_served)
+    assert requests_served == ["/missing.png"]
+    assert all(os.path.exists(os.path.join(folder, src)) for src in rebuilt.values())
+    if poster_mirror.Image is not None:
+        assert rebuilt == local
+
+    storage.configure()
+
+server.shutdown()
+print("\nPoster mirror OK.")
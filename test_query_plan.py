@@ -0,0 +1,34 @@
+# ---------------------------------------------------------
+# test_query_plan.py
+# Checks that the sort / filter queries seek through the
+# composite (user_id, rating) and (user_id, year) indexes
+# of user_movies, on a throwaway database
+# ---------------------------------------------------------
+
+import tempfile
+
+import storage.movie_storage_sql as storage
+
+checks = [
+    ({"sort_by": "rating", "descending": True}, "idx_movies_user_rating"),
+    ({"sort_by": "year"}, "idx_movies_user_year"),
+    ({"sort_by": "year", "descending": True}, "idx_movies_user_year"),
+    ({"min_rating": 7.0}, "idx_movies_user_rating"),
+    ({"start_year": 1990, "end_year": 2000}, "idx_movies_user_year"),
+]
+
+with tempfile.TemporaryDirectory() as folder:
+    storage.configure(db_url=f"sqlite:///{folder}/movies.db")
+    for query_args, index_name in checks:
+        plan = storage.explain_movie_query(1, **query_args)
+        print(query_args, "->", plan)
+        assert any(index_name in line for line in plan), f"{index_name} not used for {query_args}"
+        # movies is a view: user_movies (um) and catalog (c) are the tables read.
+        # Both must be seeks; "SCAN um", even USING an index, reads every row
+        for line in plan:
+            words = line.split()
+            if len(words) > 1 and words[1] in ("um", "user_movies", "c", "catalog"):
+                assert words[0] == "SEARCH", f"full scan for {query_args}: {line}"
+    storage.configure()
+
+print("\nAll query plans use the composite indexes.")
@@ -0,0 +1,98 @@
+# ---------------------------------------------------------
+# test_refresh_ratings.py
+# Tester for refresh_ratings.py (Movie Project)
+# Answers lookups from a local stand-in for OMDb and checks that
+# shared titles are fetched once, a rating only goes to the
+# catalog entry of the year OMDb answered with, unreadable
+# answers are skipped, and a second run fetches nothing
+# ---------------------------------------------------------
+
+import asyncio
+import json
+import tempfile
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import movie_api
+import refresh_ratings
+import storage.movie_storage_sql as storage
+
+titles_requested = []
+
+# title -> OMDb payload; anything else is unknown
+ANSWERS = {
+    "the matrix": {"Year": "1999", "imdbRating": "9.9"},
+    "heat": {"Year": "1995", "imdbRating": "8.3"},
+    "dune": {"Year": "2021", "imdbRating": "8.0"},
+    "friends": {"Year": "1994–2004", "imdbRating": "8.9"},
+    "broken": {"Year": "2001", "imdbRating": "not a number"},
+}
+
+
+class FakeOmdbHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        title = parse_qs(urlparse(self.path).query)["t"][0]
+        titles_requested.append(title)
+        if title.lower() in ANSWERS:
+            body = dict(ANSWERS[title.lower()], Response="True", Poster="N/A")
+        else:
+            body = {"Response": "False", "Error": "Movie not found!"}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOmdbHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+movie_api.set_client(movie_api.OmdbClient(base_url=f"http://127.0.0.1:{server.server_address[1]}/"))
+movie_api.CACHE_ENABLED = False
+
+with tempfile.TemporaryDirectory() as folder:
+    storage.configure(db_url=f"sqlite:///{folder}/movies.db")
+    alice = storage.add_user("alice")["id"]
+    bob = storage.add_user("bob")["id"]
+    storage.add_movie(alice, "The Matrix", 1999, 5.0)
+    storage.add_movie(bob, "the matrix", 1999, 5.0)
+    storage.add_movie(bob, "Unknown Film", 2001, 4.0)
+    storage.add_movie(bob, "Heat", 1995, 8.3)
+    storage.update_movie(bob, "Heat", 3.0)   # bob's own rating survives refreshes
+    storage.add_movie(alice, "Dune", 1984, 6.3)
+    storage.add_movie(bob, "Dune", 2021, 7.0)
+    storage.add_movie(alice, "Friends", 1994, 5.0)
+    storage.add_movie(alice, "Broken", 2001, 5.0)
+
+    print("-- First run --")
+    cutoff = datetime.now(timezone.utc).isoformat()
+    titles, entries = asyncio.run(refresh_ratings.refresh_ratings(cutoff, concurrency=4))
+    print("Requests:", titles_requested, "titles:", titles, "entries:", entries)
+    assert len(titles_requested) == 6, "shared titles should be fetched once"
+    assert entries == 4
+    assert storage.list_movies(alice)["The Matrix"]["rating"] == 9.9
+    assert storage.list_movies(bob)["the matrix"]["rating"] == 9.9
+    assert storage.list_movies(bob)["Unknown Film"]["rating"] == 4.0
+    assert storage.list_movies(bob)["Heat"]["rating"] == 3.0
+    # OMDb answered with the 2021 film; the 1984 one keeps its rating
+    assert storage.list_movies(alice)["Dune"]["rating"] == 6.3
+    assert storage.list_movies(bob)["Dune"]["rating"] == 8.0
+    assert storage.list_movies(alice)["Friends"]["rating"] == 8.9   # ranged series year
+    assert storage.list_movies(alice)["Broken"]["rating"] == 5.0    # unreadable, skipped
+
+    print("\n-- Second run with the same cutoff (only the skipped title is left) --")
+    titles_requested.clear()
+    titles, entries = asyncio.run(refresh_ratings.refresh_ratings(cutoff))
+    assert titles_requested == ["Broken"] and entries == 0   # only the skipped one
+
+    storage.configure()
+
+server.shutdown()
+print("\nRating refresh OK.")
@@ -1,4 +1,5 @@
-from storage.movie_storage_sql import add_movie, list_movies, delete_movie, update_movie, add_user, get_all_users
+from storage.movie_storage_sql import (add_movie, list_movies, delete_movie, update_movie, add_user,
+                                       get_all_users, get_statistics, search_movies)
 
 # Make sure we have a test user
 user = add_user("TestUser")
@@ -16,6 +17,12 @@ add_movie(user_id, "Inception", 2010, 8.8)
 print("\n-- List --")
 print(list_movies(user_id))
 
+print("\n-- Search --")
+print(search_movies(user_id, "incep"))
+
+print("\n-- Stats --")
+print(get_statistics(user_id))
+
 print("\n-- Update --")
 update_movie(user_id, "Inception", 9.0)
 print(list_movies(user_id))
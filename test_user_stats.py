@@ -0,0 +1,74 @@
+# ---------------------------------------------------------
+# test_user_stats.py
+# Tester for the trigger-maintained user_stats table (Movie Project)
+# Runs random adds, deletes, rating updates and catalog refreshes,
+# then checks the stored stats still match a full recount
+# ---------------------------------------------------------
+
+import contextlib
+import io
+import random
+import tempfile
+
+from sqlalchemy import text
+
+import storage.movie_storage_sql as storage
+from benchmarks import synthetic
+
+with tempfile.TemporaryDirectory() as folder:
+    storage.configure(db_url=f"sqlite:///{folder}/movies.db")
+    user_ids = synthetic.generate(users=30, movies=3_000, seed=1)
+    assert storage.verify_user_stats() == []
+
+    rng = random.Random(5)
+    with contextlib.redirect_stdout(io.StringIO()):   # storage writes print per call
+        for i in range(300):
+            user_id = rng.choice(user_ids)
+            titles = list(storage.list_movies(user_id))
+            action = rng.random()
+            if action < 0.4 or not titles:
+                storage.add_movie(user_id, f"New Movie {i}", 2000, round(rng.uniform(1, 10), 1))
+            elif action < 0.6:
+                storage.delete_movie(user_id, rng.choice(titles))
+            elif action < 0.8:
+                storage.update_movie(user_id, rng.choice(titles), round(rng.uniform(1, 10), 1))
+            else:
+                title, year, _, _ = synthetic.catalog_movie(rng.randrange(750))
+                storage.apply_rating_refresh([(title, year, round(rng.uniform(1, 10), 1))],
+                                             cutoff="9999", refreshed_at="9999")
+    print("Drift after 300 random writes:", storage.verify_user_stats())
+    assert storage.verify_user_stats() == []
+
+    for user_id in user_ids[:5]:
+        stored = storage.get_user_stats(user_id)
+        scanned = storage.get_statistics(user_id)
+        print(user_id, stored)
+        assert stored["count"] == scanned["count"]
+        assert abs(stored["average"] - scanned["average"]) < 1e-9
+        assert (stored["median"], stored["min"], stored["max"]) == \
+            (scanned["median"], scanned["min"], scanned["max"])
+        assert stored["best_titles"] == scanned["best_titles"]
+        assert stored["worst_titles"] == scanned["worst_titles"]
+
+    print("\n-- Ties list every title --")
+    tied = storage.add_user("ties")["id"]
+    storage.add_movies(tied, [("b", 2000, 9.0, None), ("A", 2001, 9.0, None),
+                              ("c", 2002, 1.5, None), ("D", 2003, 1.5, None),
+                              ("e", 2004, 5.0, None)])
+    stats = storage.get_user_stats(tied)
+    print(stats)
+    assert stats["best_titles"] == ["A", "b"] and stats["worst_titles"] == ["c", "D"]
+    assert stats["best_titles"] == storage.get_statistics(tied)["best_titles"]
+
+    print("\n-- Drift is found and repaired --")
+    with storage.get_engine().connect() as connection:
+        connection.execute(text("UPDATE user_stats SET movie_count = movie_count + 1 "
+                                "WHERE user_id = :user_id"), {"user_id": user_ids[0]})
+        connection.commit()
+    assert storage.verify_user_stats() == [user_ids[0]]
+    storage.rebuild_user_stats([user_ids[0]])
+    assert storage.verify_user_stats() == []
+
+    storage.configure()
+
+print("\nUser stats OK.")
@@ -0,0 +1,129 @@
+# ---------------------------------------------------------
+# test_writer.py
+# Tester for storage/writer.py (Movie Project)
+# Concurrent writes through the group-commit writer queue:
+# grouping, per-operation failures, lock retries, other processes
+# ---------------------------------------------------------
+
+import contextlib
+import io
+import multiprocessing
+import sqlite3
+import tempfile
+import threading
+import time
+
+import metrics
+import storage.movie_storage_sql as storage
+
+
+def add_many(db_url, user_id, prefix, n):
+    storage.configure(db_url=db_url)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [storage.add_movie(user_id, f"{prefix} {i}", 2000, 5.0) for i in range(n)]
+    storage.configure()
+    assert all(results)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as folder:
+        db_url = f"sqlite:///{folder}/movies.db"
+        storage.configure(db_url=db_url)
+        metrics.enable()
+        metrics.reset()
+
+        # Many threads at once: everything lands, in fewer commits than writes
+        user_id = storage.add_user("threads")["id"]
+        with contextlib.redirect_stdout(io.StringIO()):
+            threads = [threading.Thread(target=lambda t=t: [
+                storage.add_movie(user_id, f"Thread {t} movie {i}", 1990 + i, 7.0)
+                for i in range(50)]) for t in range(16)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        counters = metrics.snapshot()["counters"]
+        print("Operations:", counters["storage.writer.operations"],
+              "commits:", counters["storage.writer.groups"])
+        assert storage.count_movies(user_id) == 16 * 50
+        assert counters["storage.writer.groups"] < counters["storage.writer.operations"]
+        assert counters["storage.add_movie.queries"] >= 16 * 50   # charged to the callers
+
+        # A failing operation doesn't take its group down with it
+        futures = [storage.get_writer().submit(lambda connection, i=i: connection.exec_driver_sql(
+            "INSERT INTO users (name) VALUES (?)", (f"user {i % 5}",)).lastrowid)
+            for i in range(10)]
+        failed = [future.exception() is not None for future in futures]
+        assert failed == [False] * 5 + [True] * 5
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert storage.add_user("threads") is None
+
+        # Another connection holds the write lock: the writer backs off and retries
+        blocker = sqlite3.connect(f"{folder}/movies.db", isolation_level=None,
+                                  check_same_thread=False)
+        blocker.execute("BEGIN IMMEDIATE")
+        threading.Timer(0.3, blocker.rollback).start()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert storage.add_movie(user_id, "Waited", 2001, 6.0)
+        print(f"Waited {time.perf_counter() - started:.2f}s for the lock,",
+              metrics.snapshot()["counters"]["storage.writer.retries"], "retries")
+        blocker.close()
+
+        # Rollback journal: a reader's SHARED lock makes COMMIT itself busy.
+        # The group is rolled back for real and run again, and batch
+        # operations report each row once
+        storage.configure(db_url=f"sqlite:///{folder}/journal.db", profile=False)
+        journal_user = storage.add_user("journal")["id"]
+        for attempt in range(2):
+            reader = sqlite3.connect(f"{folder}/journal.db", isolation_level=None,
+                                     check_same_thread=False)
+            reader.execute("BEGIN")
+            reader.execute("SELECT * FROM users").fetchall()
+            release = threading.Timer(0.3, reader.rollback)
+            release.start()
+            retries = metrics.snapshot()["counters"].get("storage.writer.retries", 0)
+            with contextlib.redirect_stdout(io.StringIO()):
+                if attempt == 0:
+                    assert storage.add_movie(journal_user, "Journal", 2001, 6.0)
+                else:
+                    outcomes = storage.add_movies(journal_user, iter([
+                        ("Journal 2", 2002, 7.0, None), ("journal 2", 2002, 7.0, None),
+                        ("Journal 3", 2003, None, None)]))
+                    assert outcomes == [("Journal 2", storage.INSERTED),
+                                        ("journal 2", storage.DUPLICATE),
+                                        ("Journal 3", storage.INVALID)], outcomes
+            release.join()
+            reader.close()
+            assert metrics.snapshot()["counters"]["storage.writer.retries"] > retries
+        assert storage.update_movies(journal_user, [("Journal", 8.0), ("Nope", 1.0)]) == [
+            ("Journal", storage.UPDATED), ("Nope", storage.NOT_FOUND)]
+        assert storage.delete_movies(journal_user, ["Journal 2"]) == [
+            ("Journal 2", storage.DELETED)]
+        assert sorted(storage.list_movies(journal_user)) == ["Journal"]
+        storage.configure(db_url=db_url)
+
+        # Other processes writing at the same time
+        storage.close_writer()
+        user_ids = [storage.add_user(f"process {p}")["id"] for p in range(3)]
+        processes = [multiprocessing.Process(target=add_many, args=(db_url, uid, "Film", 200))
+                     for uid in user_ids]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            assert process.exitcode == 0
+        assert [storage.count_movies(uid) for uid in user_ids] == [200] * 3
+        assert storage.verify_user_stats() == []
+
+        # With the queue off every call commits on its own connection
+        storage.WRITE_QUEUE_ENABLED = False
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert storage.update_movie(user_id, "waited", 9.5)
+        storage.WRITE_QUEUE_ENABLED = True
+        assert storage.get_movie(user_id, "Waited")["rating"] == 9.5
+
+        metrics.enable(False)
+        storage.configure()
+
+    print("\nWriter queue OK.")
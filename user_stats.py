@@ -0,0 +1,46 @@
+# ---------------------------------------------------------
+# user_stats.py
+# Checks the trigger-maintained user_stats table against the
+# movies it summarizes, and repairs drift
+#
+# Usage:
+#   python3 user_stats.py                  (verify only; exit code 1 on drift)
+#   python3 user_stats.py --rebuild        (recompute users that drifted)
+#   python3 user_stats.py --rebuild --all  (recompute everyone)
+# ---------------------------------------------------------
+
+import argparse
+import sys
+import time
+
+import storage.movie_storage_sql as storage
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Verify or rebuild per-user stats.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute drifted stats")
+    parser.add_argument("--all", action="store_true", help="with --rebuild: recompute every user")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.rebuild and args.all:
+        storage.rebuild_user_stats()
+        print(f"Rebuilt stats for every user in {time.perf_counter() - started:.1f}s.")
+        return 0
+
+    drifted = storage.verify_user_stats()
+    if not drifted:
+        print(f"All user stats are current ({time.perf_counter() - started:.1f}s).")
+        return 0
+    print(f"Stats differ from the movies for {len(drifted)} user(s): "
+          f"{', '.join(map(str, drifted))}")
+    if not args.rebuild:
+        return 1
+    storage.rebuild_user_stats(drifted)
+    remaining = storage.verify_user_stats()
+    print("Rebuilt." if not remaining else f"Still differing after rebuild: {remaining}")
+    return 0 if not remaining else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
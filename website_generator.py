@@ -1,43 +1,364 @@
 # website_generator.py
+#
+# Usage for a batch rebuild of every profile's site plus _static/index.html:
+#   python3 website_generator.py --all [--workers 8] [--force]
+#                                [--page-size 100] [--json] [--mirror-posters]
+import argparse
+import hashlib
+import html
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import quote
+
+import metrics
 import storage.movie_storage_sql as storage
 
+TEMPLATE_FILE = "_static/index_template.html"
+OUTPUT_FOLDER = "_static"
+INDEX_FILE = "_static/index.html"
+PLACEHOLDER_POSTER = "https://via.placeholder.com/128x193.png?text=No+Image"
+LOCAL_PLACEHOLDER_POSTER = "no_poster.svg"   # used when posters are mirrored
+CLIENT_SCRIPT = "movie_grid.js"   # renders <username>.json pages in the browser
+
+# Output mode used by generate_website():
+#   SITE_PAGE_SIZE = None -> one HTML file with every movie
+#   SITE_PAGE_SIZE = N    -> <username>.html, <username>-2.html, ... with N movies each
+#   SITE_JSON = True      -> <username>.json plus a page that renders it client-side
+#   SITE_MIRROR_POSTERS   -> download posters into _static/posters and link those
+SITE_PAGE_SIZE = None
+SITE_JSON = False
+SITE_MIRROR_POSTERS = False
+
+# Bump when the generated markup changes, so existing sites get rebuilt
+GRID_FORMAT_VERSION = 2
+
+# Compiled templates: path -> (mtime, text before grid, text after grid, build key)
+_template_cache = {}
 
-def generate_website(user_id, username):
-    """Generate index.html (or username.html) using the movies stored for a user."""
-    movies = storage.list_movies(user_id)
 
-    # Read the template file
-    with open("_static/index_template.html", "r", encoding="utf-8") as f:
-        template = f.read()
+def load_template(path=TEMPLATE_FILE):
+    """
+    Return the template split around __TEMPLATE_MOVIE_GRID__, plus a build key
+    that changes with the template content. Re-read only if the file changed.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    compiled = _template_cache.get(path)
+    if compiled is None or compiled[0] != mtime:
+        with open(path, "r", encoding="utf-8") as f:
+            template = f.read()
+        head, _, tail = template.partition("__TEMPLATE_MOVIE_GRID__")
+        digest = hashlib.sha1(template.encode("utf-8")).hexdigest()
+        compiled = (mtime, head, tail, f"{GRID_FORMAT_VERSION}:{digest}")
+        _template_cache[path] = compiled
+    return compiled[1:]
 
-    # Build the movie grid HTML
-    movie_grid_html = ""
-    for title, info in movies.items():
-        year = info.get("year", "Unknown")
-        poster_url = info.get("poster_url")
 
-        # Fallback if no poster from API
-        if not poster_url or poster_url == "None":
-            poster_url = "https://via.placeholder.com/128x193.png?text=No+Image"
+def poster_src(poster_url, posters=None):
+    """
+    Return the <img> src for a poster URL. With a `posters` map from
+    poster_mirror.mirror_posters() local copies are used where available.
+    """
+    # Fallback if no poster from API
+    if not poster_url or poster_url == "None":
+        return PLACEHOLDER_POSTER if posters is None else LOCAL_PLACEHOLDER_POSTER
+    if posters is None:
+        return poster_url
+    return posters.get(poster_url, poster_url)
 
-        movie_grid_html += f"""
+
+def render_movie(movie, posters=None):
+    """Return the grid <li> for one movie row."""
+    poster_url = poster_src(movie.get("poster_url"), posters)
+
+    title = html.escape(movie["title"])
+    return f"""
         <li>
             <div class="movie">
-                <img src="{poster_url}" alt="{title} poster" class="movie-poster">
+                <img src="{html.escape(poster_url)}" alt="{title} poster" class="movie-poster"
+                     loading="lazy" width="128" height="193">
                 <div class="movie-title">{title}</div>
-                <div class="movie-year">{year}</div>
-                <p>Rating: {info.get("rating", "N/A")}</p>
+                <div class="movie-year">{movie.get("year", "Unknown")}</div>
+                <p>Rating: {movie.get("rating", "N/A")}</p>
+            </div>
+        </li>
+        """
+
+
+def _write_timed(f, chunks):
+    """Write chunks, splitting the time into producing them (render) and writing."""
+    render_seconds = write_seconds = 0.0
+    chunks = iter(chunks)
+    while True:
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        produced = time.perf_counter()
+        render_seconds += produced - started
+        if chunk is None:
+            break
+        f.write(chunk)
+        write_seconds += time.perf_counter() - produced
+    metrics.observe("site.render", render_seconds)
+    metrics.observe("site.write", write_seconds)
+
+
+def write_atomically(output_file, chunks):
+    """
+    Stream text chunks into a temp file next to output_file, then swap it in,
+    so readers never see a half-written page.
+    """
+    folder = os.path.dirname(output_file) or "."
+    fd, temp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            if metrics.ENABLED:
+                _write_timed(f, chunks)
+            else:
+                for chunk in chunks:
+                    f.write(chunk)
+        os.replace(temp_path, output_file)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def page_file(username, number):
+    """Output path of page `number` (1-based) of a user's site."""
+    if number == 1:
+        return f"{OUTPUT_FOLDER}/{username}.html"
+    return f"{OUTPUT_FOLDER}/{username}-{number}.html"
+
+
+def json_file(username):
+    """Output path of a user's JSON data file."""
+    return f"{OUTPUT_FOLDER}/{username}.json"
+
+
+def _insert_before_body_end(tail, markup):
+    """Put markup right before </body>, or at the very end if there is none."""
+    position = tail.rfind("</body>")
+    if position == -1:
+        return tail + markup
+    return tail[:position] + markup + tail[position:]
+
+
+def render_page_nav(username, number, page_count):
+    """Return the previous / next links for page `number`."""
+    links = []
+    if number > 1:
+        href = quote(os.path.basename(page_file(username, number - 1)))
+        links.append(f'<a href="{href}">&laquo; Previous</a>')
+    links.append(f"<span>Page {number} of {page_count}</span>")
+    if number < page_count:
+        href = quote(os.path.basename(page_file(username, number + 1)))
+        links.append(f'<a href="{href}">Next &raquo;</a>')
+    return f'\n<div class="page-nav">{" ".join(links)}</div>\n'
+
+
+def _remove_stale_files(username, page_count, keep_json):
+    """Delete pages beyond page_count (and the JSON file) left by earlier builds."""
+    pattern = re.compile(re.escape(username) + r"-(\d+)\.html")
+    stale = [name for name in os.listdir(OUTPUT_FOLDER)
+             if (match := pattern.fullmatch(name)) and int(match.group(1)) > page_count]
+    if stale:
+        # "amy-2.html" may also be the first page of a user called "amy-2"
+        usernames = {user["name"] for user in storage.get_all_users()}
+        for name in stale:
+            if name[:-len(".html")] not in usernames:
+                os.remove(os.path.join(OUTPUT_FOLDER, name))
+    if not keep_json and os.path.exists(json_file(username)):
+        os.remove(json_file(username))
+
+
+def _json_chunks(user_id, posters=None):
+    """Stream a user's movies as a compact JSON array of [title, year, rating, poster]."""
+    yield "["
+    for index, movie in enumerate(storage.iter_movies(user_id)):
+        poster = movie["poster_url"]
+        if posters is not None:
+            poster = poster_src(poster, posters)
+        row = [movie["title"], movie["year"], movie["rating"], poster]
+        yield ("," if index else "") + json.dumps(row, separators=(",", ":"))
+    yield "]"
+
+
+@metrics.instrument("site", count_rows=False)
+def build_site(user_id, username, force=False, page_size=None, json_data=False,
+               mirror_posters=False):
+    """
+    Write <username>.html inside _static using the movies stored for a user.
+    page_size splits the grid into linked pages; json_data writes
+    <username>.json and a page that renders it in the browser instead;
+    mirror_posters links local copies of the posters (see poster_mirror).
+    Skipped when neither the collection, the template nor the options changed
+    since the last build (force=True rebuilds anyway).
+    Returns (written, output_file).
+    """
+    head, tail, template_key = load_template()
+    build_key = f"{template_key}:pages={page_size}:json={json_data}:mirror={mirror_posters}"
+    output_file = page_file(username, 1)
+
+    version = storage.get_collection_version(user_id)
+    last_build = storage.get_site_build(user_id)
+    if (not force and last_build is not None
+            and last_build["collection_version"] == version
+            and last_build["build_key"] == build_key
+            and last_build["output_file"] == output_file
+            and os.path.exists(output_file)):
+        return False, output_file
+
+    title = f"{username}'s Movie App"
+    head = head.replace("__TEMPLATE_TITLE__", title)
+    tail = tail.replace("__TEMPLATE_TITLE__", title)
+
+    posters = None
+    if mirror_posters:
+        # Imported here: it pulls in requests and Pillow, which `import movies` shouldn't pay for
+        import poster_mirror
+        urls = {movie["poster_url"] for movie in storage.iter_movies(user_id)}
+        with metrics.timer("site.mirror_posters"):
+            posters = poster_mirror.mirror_posters(urls)
+
+    if json_data:
+        write_atomically(json_file(username), _json_chunks(user_id, posters))
+        source = html.escape(quote(os.path.basename(json_file(username))))
+        script = (f'\n<script src="{CLIENT_SCRIPT}" data-source="{source}" '
+                  f'data-page-size="{page_size or 0}"></script>\n')
+        write_atomically(output_file, [head, _insert_before_body_end(tail, script)])
+        page_count = 1
+    elif page_size:
+        page_count = max(1, -(-storage.count_movies(user_id) // page_size))
+        movies = storage.iter_movies(user_id)
+        for number in range(1, page_count + 1):
+            rows = (render_movie(movie, posters)
+                    for movie in itertools.islice(movies, page_size))
+            nav = render_page_nav(username, number, page_count)
+            write_atomically(page_file(username, number),
+                             itertools.chain([head], rows, [_insert_before_body_end(tail, nav)]))
+    else:
+        page_count = 1
+        rows = (render_movie(movie, posters) for movie in storage.iter_movies(user_id))
+        write_atomically(output_file, itertools.chain([head], rows, [tail]))
+
+    _remove_stale_files(username, page_count, keep_json=json_data)
+    storage.record_site_build(user_id, version, build_key, output_file)
+    return True, output_file
+
+
+def generate_website(user_id, username, force=False):
+    """
+    Build one user's site (see build_site) with the SITE_* options and
+    report it. Returns True if written.
+    """
+    written, output_file = build_site(user_id, username, force, SITE_PAGE_SIZE,
+                                      SITE_JSON, SITE_MIRROR_POSTERS)
+    if written:
+        print(f"Website for {username} was generated successfully → {output_file}")
+    else:
+        print(f"Website for {username} is already up to date → {output_file}")
+    return written
+
+
+# ---------- ALL USERS ----------
+
+def _init_worker(db_url):
+    """Process pool initializer: point the worker's storage at the same DB."""
+    storage.configure(db_url=db_url)
+
+
+def _build_site_timed(user_id, username, force, page_size, json_data, mirror):
+    """Worker task: build one site and report how long it took."""
+    started = time.perf_counter()
+    written, output_file = build_site(user_id, username, force, page_size, json_data, mirror)
+    return {
+        "user_id": user_id,
+        "username": username,
+        "written": written,
+        "output_file": output_file,
+        "movies": storage.count_movies(user_id),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def write_index(results, index_file=INDEX_FILE):
+    """Write the top-level page linking to every user's site."""
+    head, tail, _ = load_template()
+    title = "Movie App Profiles"
+
+    def page_chunks():
+        yield head.replace("__TEMPLATE_TITLE__", title)
+        for result in sorted(results, key=lambda r: r["username"].lower()):
+            href = quote(os.path.basename(result["output_file"]))
+            name = html.escape(result["username"])
+            yield f"""
+        <li>
+            <div class="movie">
+                <div class="movie-title"><a href="{href}">{name}</a></div>
+                <div class="movie-year">{result["movies"]} movie(s)</div>
             </div>
         </li>
         """
+        yield tail.replace("__TEMPLATE_TITLE__", title)
+
+    write_atomically(index_file, page_chunks())
+
+
+def build_all_sites(workers=None, force=False, page_size=None, json_data=False,
+                    mirror_posters=False):
+    """
+    Build every profile's site in a process pool, then the index page.
+    Returns the per-user results (see _build_site_timed), in completion order.
+    """
+    users = [user for user in storage.get_all_users()
+             if f"{OUTPUT_FOLDER}/{user['name']}.html" != INDEX_FILE]
+    results = []
+    # spawn: workers open their own DB connections instead of inheriting ours
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(storage.DB_URL,)) as pool:
+        futures = [pool.submit(_build_site_timed, user["id"], user["name"], force,
+                               page_size, json_data, mirror_posters)
+                   for user in users]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = "built" if result["written"] else "up to date"
+            print(f"{result['username']:20} {result['movies']:7} movie(s) "
+                  f"{result['seconds'] * 1000:8.1f} ms  {status}")
+
+    write_index(results)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate movie websites.")
+    parser.add_argument("--all", action="store_true", required=True,
+                        help="build every user's site and the index page")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="rebuild unchanged sites too")
+    parser.add_argument("--page-size", type=int, default=None,
+                        help="movies per page (default: everything on one page)")
+    parser.add_argument("--json", action="store_true",
+                        help="write <user>.json and render it client-side")
+    parser.add_argument("--mirror-posters", action="store_true",
+                        help="download posters into _static/posters and link the local copies")
+    args = parser.parse_args(argv)
 
-    # Replace placeholders in the template
-    final_html = template.replace("__TEMPLATE_TITLE__", f"{username}'s Movie App")
-    final_html = final_html.replace("__TEMPLATE_MOVIE_GRID__", movie_grid_html)
+    started = time.perf_counter()
+    results = build_all_sites(args.workers, args.force, args.page_size, args.json,
+                              args.mirror_posters)
+    built = sum(1 for result in results if result["written"])
+    print(f"\n{built} of {len(results)} site(s) rebuilt in "
+          f"{time.perf_counter() - started:.1f}s → {INDEX_FILE}")
+    return 0
 
-    # Save website as <username>.html inside _static
-    output_file = f"_static/{username}.html"
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(final_html)
 
-    print(f"Website for {username} was generated successfully → {output_file}")
+if __name__ == "__main__":
+    sys.exit(main())